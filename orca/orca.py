@@ -8,20 +8,40 @@ try:
     from inspect import getfullargspec as getargspec
 except ImportError:
     from inspect import getargspec
+import asyncio
+import gc
+import hashlib
+import inspect
+import itertools
 import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
 import time
+import traceback
 import warnings
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 try:
     from collections.abc import Callable
 except ImportError:  # Python 2.7
     from collections import Callable
 from contextlib import contextmanager
-from functools import wraps
+from functools import partial, wraps
 
 
+import numpy as np
 import pandas as pd
 import tables
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # Python < 3.8
+    resource_tracker = shared_memory = None
 import tlz as tz
 
 from . import utils
@@ -32,6 +52,7 @@ logger = logging.getLogger(__name__)
 
 _TABLES = {}
 _COLUMNS = {}
+_COLUMNS_BY_TABLE = {}
 _STEPS = {}
 _BROADCASTS = {}
 _INJECTABLES = {}
@@ -45,8 +66,47 @@ _MEMOIZED = {}
 _CS_FOREVER = 'forever'
 _CS_ITER = 'iteration'
 _CS_STEP = 'step'
-
-CacheItem = namedtuple('CacheItem', ['name', 'value', 'scope'])
+_CS_AUTO = 'auto'
+
+_VERSIONS = itertools.count(1)
+_INJECTABLE_VERSIONS = {}
+
+# resolved argument lists for _collect_variables
+_PLANS = {}
+# reverse dependency index, see _index_reads
+_READERS = {}
+_READS = {}
+# registered tables, columns, and injectables with coroutine functions
+_ASYNC_NODES = set()
+
+_CACHE_BUDGET = None
+_CACHE_POLICY = 'lru'
+_CACHE_POLICIES = ('lru', 'cost')
+_CACHE_LAST_USED = {}
+_CACHE_CLOCK = 0
+# guards the caches and their bookkeeping when functions are
+# evaluated on several threads
+_CACHE_LOCK = threading.RLock()
+_DISK_CACHE_DIR = None
+_SPILL_DIR = None
+_COLUMN_WORKERS = 1
+_PROCESS_POOL = None
+_PROCESS_POOL_OPTIONS = {'workers': None, 'start_method': None}
+_EXECUTORS = (None, 'process')
+_STORAGES = ('frame', 'columns')
+# results of async functions gathered ahead of argument collection
+_ASYNC_LOCAL = threading.local()
+# results of all functions evaluated during eval_variables
+_EVAL_MEMO = None
+_CACHE_STATS = {}
+
+CacheItem = namedtuple(
+    'CacheItem', ['name', 'value', 'scope', 'nbytes', 'cost', 'versions'])
+# size and compute time are only tracked for budgeted caches,
+# input versions only for the 'auto' scope
+CacheItem.__new__.__defaults__ = (0, 0., None)
+
+MemoInfo = namedtuple('MemoInfo', ['hits', 'misses', 'maxsize', 'currsize'])
 
 
 def clear_all():
@@ -56,12 +116,21 @@ def clear_all():
     """
     _TABLES.clear()
     _COLUMNS.clear()
+    _COLUMNS_BY_TABLE.clear()
     _STEPS.clear()
     _BROADCASTS.clear()
     _INJECTABLES.clear()
+    _INJECTABLE_VERSIONS.clear()
+    _PLANS.clear()
+    _READERS.clear()
+    _READS.clear()
+    _ASYNC_NODES.clear()
+    _clear_spilled()
     _TABLE_CACHE.clear()
     _COLUMN_CACHE.clear()
     _INJECTABLE_CACHE.clear()
+    _CACHE_LAST_USED.clear()
+    _CACHE_STATS.clear()
     for m in _MEMOIZED.values():
         m.value.clear_cached()
     _MEMOIZED.clear()
@@ -74,23 +143,27 @@ def clear_cache(scope=None):
 
     Parameters
     ----------
-    scope : {None, 'step', 'iteration', 'forever'}, optional
+    scope : {None, 'step', 'iteration', 'forever', 'auto'}, optional
         Clear cached values with a given scope.
         By default all cached values are removed.
 
     """
     if not scope:
-        _TABLE_CACHE.clear()
-        _COLUMN_CACHE.clear()
-        _INJECTABLE_CACHE.clear()
+        with _CACHE_LOCK:
+            _clear_spilled()
+            _TABLE_CACHE.clear()
+            _COLUMN_CACHE.clear()
+            _INJECTABLE_CACHE.clear()
+            _CACHE_LAST_USED.clear()
         for m in _MEMOIZED.values():
             m.value.clear_cached()
         logger.debug('pipeline cache cleared')
     else:
         for d in (_TABLE_CACHE, _COLUMN_CACHE, _INJECTABLE_CACHE):
-            items = tz.valfilter(lambda x: x.scope == scope, d)
+            with _CACHE_LOCK:
+                items = tz.valfilter(lambda x: x.scope == scope, d)
             for k in items:
-                del d[k]
+                _pop_cached(d, k)
         for m in tz.filter(lambda x: x.scope == scope, _MEMOIZED.values()):
             m.value.clear_cached()
         logger.debug('cleared cached values with scope {!r}'.format(scope))
@@ -183,7 +256,8 @@ def _update_scope(wrapper, new_scope=None):
         None: 0,
         _CS_STEP: 1,
         _CS_ITER: 2,
-        _CS_FOREVER: 3
+        _CS_FOREVER: 3,
+        _CS_AUTO: 3
     }
     if new_scope not in scopes.keys():
         msg = '{} is not an allowed cache scope, '.format(new_scope)
@@ -220,7 +294,7 @@ def update_injectable_scope(name, new_scope=None):
     name: str
         Name of the injectable to update.
     new_scope: str, optional default None
-        Valid values: None, 'forever', 'iteration', 'step'
+        Valid values: None, 'forever', 'iteration', 'step', 'auto'
         None implies no caching.
 
     """
@@ -241,7 +315,7 @@ def update_column_scope(table_name, column_name, new_scope=None):
     column_name: str
         Name of the column to update.
     new_scope: str, optional default None
-        Valid values: None, 'forever', 'iteration', 'step'
+        Valid values: None, 'forever', 'iteration', 'step', 'auto'
         None implies no caching.
 
     """
@@ -260,7 +334,7 @@ def update_table_scope(name, new_scope=None):
     name: str
         Name of the table to update.
     new_scope: str, optional default None
-        Valid values: None, 'forever', 'iteration', 'step'
+        Valid values: None, 'forever', 'iteration', 'step', 'auto'
         None implies no caching.
 
     """
@@ -312,390 +386,1165 @@ def cache_disabled():
         enable_cache()
 
 
-# for errors that occur during Orca runs
-class OrcaError(Exception):
-    pass
+def set_cache_budget(nbytes=None, policy='lru'):
+    """
+    Limit the memory used by cached tables, columns, and injectables.
 
+    When storing a new cached value would take the cache over the budget,
+    other cached values are evicted until it fits. Evicted values are
+    recomputed the next time they are requested.
 
-class DataFrameWrapper(object):
-    """
-    Wraps a DataFrame so it can provide certain columns and handle
-    computed columns.
+    Cached tables count toward the budget but are never evicted,
+    since steps may update them in place with `update_col` and
+    evicting them would discard those updates.
 
     Parameters
     ----------
-    name : str
-        Name for the table.
-    frame : pandas.DataFrame
-    copy_col : bool, optional
-        Whether to return copies when evaluating columns.
-
-    Attributes
-    ----------
-    name : str
-        Table name.
-    copy_col : bool
-        Whether to return copies when evaluating columns.
-    local : pandas.DataFrame
-        The wrapped DataFrame.
+    nbytes : int, optional
+        Maximum number of bytes held in the cache. None (the default)
+        removes the limit.
+    policy : {'lru', 'cost'}, optional
+        How to choose values to evict. 'lru' evicts the least recently
+        used values first, 'cost' evicts the values that were cheapest
+        to compute per byte first.
 
     """
-    def __init__(self, name, frame, copy_col=True):
-        self.name = name
-        self.local = frame
-        self.copy_col = copy_col
+    global _CACHE_BUDGET, _CACHE_POLICY
 
-    @property
-    def columns(self):
-        """
-        Columns in this table.
+    if policy not in _CACHE_POLICIES:
+        raise ValueError(
+            '{!r} is not an allowed cache policy, allowed policies '
+            'are {}'.format(policy, list(_CACHE_POLICIES)))
 
-        """
-        return self.local_columns + list_columns_for_table(self.name)
+    _CACHE_BUDGET = nbytes
+    _CACHE_POLICY = policy
+    logger.debug('cache budget set to {} bytes with policy {!r}'.format(
+        nbytes, policy))
 
-    @property
-    def local_columns(self):
-        """
-        Columns that are part of the wrapped DataFrame.
+    if nbytes is not None:
+        with _CACHE_LOCK:
+            # values cached without a budget have no recorded size
+            for _, cache in _caches():
+                for key, item in list(cache.items()):
+                    if not item.nbytes:
+                        cache[key] = item._replace(
+                            nbytes=_value_nbytes(item.value))
+            _enforce_cache_budget()
 
-        """
-        return list(self.local.columns)
 
-    @property
-    def index(self):
-        """
-        Table index.
+def get_cache_budget():
+    """
+    The current cache budget and eviction policy.
 
-        """
-        return self.local.index
+    Returns
+    -------
+    nbytes : int or None
+        None if the cache size is not limited.
+    policy : {'lru', 'cost'}
 
-    def to_frame(self, columns=None):
-        """
-        Make a DataFrame with the given columns.
+    """
+    return _CACHE_BUDGET, _CACHE_POLICY
 
-        Will always return a copy of the underlying table.
 
-        Parameters
-        ----------
-        columns : sequence or string, optional
-            Sequence of the column names desired in the DataFrame. A string
-            can also be passed if only one column is desired.
-            If None all columns are returned, including registered columns.
+def _caches():
+    """
+    The budgeted caches as (kind, dict) pairs.
 
-        Returns
-        -------
-        frame : pandas.DataFrame
+    """
+    return (
+        ('table', _TABLE_CACHE),
+        ('column', _COLUMN_CACHE),
+        ('injectable', _INJECTABLE_CACHE))
 
-        """
-        extra_cols = _columns_for_table(self.name)
 
-        if columns is not None:
-            columns = [columns] if isinstance(columns, str) else columns
-            columns = set(columns)
-            set_extra_cols = set(extra_cols)
-            local_cols = set(self.local.columns) & columns - set_extra_cols
-            df = self.local[list(local_cols)].copy()
-            extra_cols = {k: extra_cols[k] for k in (columns & set_extra_cols)}
-        else:
-            df = self.local.copy()
+def _value_nbytes(value):
+    """
+    Estimate the number of bytes used by a cached value.
 
-        with log_start_finish(
-                'computing {!r} columns for table {!r}'.format(
-                    len(extra_cols), self.name),
-                logger):
-            for name, col in extra_cols.items():
-                with log_start_finish(
-                        'computing column {!r} for table {!r}'.format(
-                            name, self.name),
-                        logger):
-                    df[name] = col()
+    Parameters
+    ----------
+    value : object
 
-        return df
+    Returns
+    -------
+    nbytes : int
+
+    """
+    if isinstance(value, _SpilledValue):
+        return 0
+    if isinstance(value, DataFrameWrapper):
+        value = value.local
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    elif isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    elif hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    else:
+        return sys.getsizeof(value)
 
-    def update_col(self, column_name, series):
-        """
-        Add or replace a column in the underlying DataFrame.
 
-        Parameters
-        ----------
-        column_name : str
-            Column to add or replace.
-        series : pandas.Series or sequence
-            Column data.
+def _cache_hit(kind, cache, key):
+    """
+    Return a cached value and mark it as recently used.
 
-        """
-        logger.debug('updating column {!r} in table {!r}'.format(
-            column_name, self.name))
-        self.local[column_name] = series
+    """
+    global _CACHE_CLOCK
+    with _CACHE_LOCK:
+        _CACHE_CLOCK += 1
+        _CACHE_LAST_USED[(kind, key)] = _CACHE_CLOCK
+        _stats_for(kind, key)['hits'] += 1
+        value = cache[key].value
+    if isinstance(value, _SpilledValue):
+        return value.load()
+    return value
 
-    def __setitem__(self, key, value):
-        return self.update_col(key, value)
 
-    def get_column(self, column_name):
-        """
-        Returns a column as a Series.
+def _stats_for(kind, key):
+    """
+    The cache statistics counters for a wrapped function.
 
-        Parameters
-        ----------
-        column_name : str
+    """
+    stats = _CACHE_STATS.get((kind, key))
+    if stats is None:
+        stats = _CACHE_STATS[(kind, key)] = {
+            'hits': 0, 'misses': 0, 'recomputations': 0, 'evictions': 0,
+            'compute_time': 0.}
+    return stats
 
-        Returns
-        -------
-        column : pandas.Series
 
-        """
-        with log_start_finish(
-                'getting single column {!r} from table {!r}'.format(
-                    column_name, self.name),
-                logger):
-            extra_cols = _columns_for_table(self.name)
-            if column_name in extra_cols:
-                with log_start_finish(
-                        'computing column {!r} for table {!r}'.format(
-                            column_name, self.name),
-                        logger):
-                    column = extra_cols[column_name]()
-            else:
-                column = self.local[column_name]
-            if self.copy_col:
-                return column.copy()
-            else:
-                return column
+def _record_miss(kind, key, cost):
+    """
+    Record that a wrapped function was evaluated instead of being
+    read from the cache.
 
-    def __getitem__(self, key):
-        return self.get_column(key)
+    Parameters
+    ----------
+    kind : {'table', 'column', 'injectable'}
+    key : str or tuple
+    cost : float
+        Seconds it took to evaluate the function.
 
-    def __getattr__(self, key):
-        return self.get_column(key)
+    """
+    with _CACHE_LOCK:
+        stats = _stats_for(kind, key)
+        if stats['misses']:
+            stats['recomputations'] += 1
+        stats['misses'] += 1
+        stats['compute_time'] += cost
 
-    def column_type(self, column_name):
-        """
-        Report column type as one of 'local', 'series', or 'function'.
 
-        Parameters
-        ----------
-        column_name : str
+def cache_stats():
+    """
+    Cache statistics for every registered table, column, and injectable
+    function.
 
-        Returns
-        -------
-        col_type : {'local', 'series', 'function'}
-            'local' means that the column is part of the registered table,
-            'series' means the column is a registered Pandas Series,
-            and 'function' means the column is a registered function providing
-            a Pandas Series.
+    Returns
+    -------
+    stats : pandas.DataFrame
+        Indexed by ``kind`` ('table', 'column', or 'injectable') and
+        ``name`` (columns are named like 'table.column'), with columns:
+
+        - cache: whether caching is enabled for the function
+        - cache_scope: the function's cache scope
+        - hits: number of times the value was returned from the cache
+        - misses: number of times the function was evaluated
+        - recomputations: evaluations after the first one
+        - evictions: number of times the value was evicted to fit
+          the cache budget
+        - compute_time: total seconds spent evaluating the function
+        - nbytes: bytes currently held in the cache for the function
+
+    """
+    funcs = tz.concatv(
+        (('table', t.name, t) for t in _TABLES.values()
+         if isinstance(t, TableFuncWrapper)),
+        (('column', k, c) for k, c in _COLUMNS.items()
+         if isinstance(c, _ColumnFuncWrapper)),
+        (('injectable', i.name, i) for i in _INJECTABLES.values()
+         if isinstance(i, _InjectableFuncWrapper)))
+    caches = dict(_caches())
+
+    rows = []
+    for kind, key, func in funcs:
+        item = caches[kind].get(key)
+        if item is None:
+            nbytes = 0
+        else:
+            nbytes = item.nbytes or _value_nbytes(item.value)
+        stats = _stats_for(kind, key)
+        rows.append(tz.merge(stats, {
+            'kind': kind,
+            'name': '.'.join(key) if kind == 'column' else key,
+            'cache': func.cache,
+            'cache_scope': func.cache_scope,
+            'nbytes': nbytes}))
 
-        """
-        extra_cols = list_columns_for_table(self.name)
+    columns = [
+        'kind', 'name', 'cache', 'cache_scope', 'hits', 'misses',
+        'recomputations', 'evictions', 'compute_time', 'nbytes']
+    return pd.DataFrame(rows, columns=columns).set_index(['kind', 'name'])
 
-        if column_name in extra_cols:
-            col = _COLUMNS[(self.name, column_name)]
 
-            if isinstance(col, _SeriesWrapper):
-                return 'series'
-            elif isinstance(col, _ColumnFuncWrapper):
-                return 'function'
+def reset_cache_stats():
+    """
+    Reset the counters reported by `cache_stats`.
 
-        elif column_name in self.local_columns:
-            return 'local'
+    """
+    _CACHE_STATS.clear()
 
-        raise KeyError('column {!r} not found'.format(column_name))
 
-    def update_col_from_series(self, column_name, series, cast=False):
-        """
-        Update existing values in a column from another series.
-        Index values must match in both column and series. Optionally
-        casts data type to match the existing column.
+def _byte_bounds(array):
+    try:
+        byte_bounds = np.byte_bounds
+    except AttributeError:  # numpy >= 2
+        byte_bounds = np.lib.array_utils.byte_bounds
+    return byte_bounds(array)
 
-        Parameters
-        ---------------
-        column_name : str
-        series : panas.Series
-        cast: bool, optional, default False
-        """
-        logger.debug('updating column {!r} in table {!r}'.format(
-            column_name, self.name))
 
-        col_dtype = self.local[column_name].dtype
-        if series.dtype != col_dtype:
-            if cast:
-                series = series.astype(col_dtype)
-            else:
-                err_msg = "Data type mismatch, existing:{}, update:{}"
-                err_msg = err_msg.format(col_dtype, series.dtype)
-                raise ValueError(err_msg)
+def _value_buffers(value):
+    """
+    Find the numpy arrays holding a value's data.
 
-        self.local.loc[series.index, column_name] = series
+    Parameters
+    ----------
+    value : object
 
-    def __len__(self):
-        return len(self.local)
+    Returns
+    -------
+    arrays : list of numpy.ndarray
+    other : int
+        Bytes used outside of `arrays`, for example by the Python
+        objects in object arrays or by values with unknown layout.
+
+    """
+    if isinstance(value, _SpilledValue):
+        # on disk until loaded
+        return [], 0
+    if isinstance(value, DataFrameWrapper):
+        value = value.local
+
+    if isinstance(value, pd.DataFrame):
+        parts = [value.index] + [col for _, col in value.items()]
+    elif isinstance(value, pd.Series):
+        parts = [value.index, value.values]
+    elif isinstance(value, pd.RangeIndex):
+        return [], int(value.memory_usage())
+    elif isinstance(value, pd.MultiIndex):
+        parts = list(value.levels) + list(value.codes)
+    elif isinstance(value, pd.Index):
+        parts = [value.values]
+    elif isinstance(value, pd.Categorical):
+        parts = [value.codes, value.categories]
+    elif isinstance(value, pd.api.extensions.ExtensionArray):
+        return [], int(value.nbytes)
+    elif isinstance(value, np.ndarray):
+        other = 0
+        if value.dtype == object:
+            other = int(pd.Series(value.ravel(), copy=False).memory_usage(
+                deep=True, index=False)) - value.nbytes
+        return [value], other
+    elif hasattr(value, 'nbytes'):
+        return [], int(value.nbytes)
+    else:
+        return [], sys.getsizeof(value)
 
-    def clear_cached(self):
+    arrays = []
+    other = 0
+    for part in parts:
+        a, o = _value_buffers(part)
+        arrays.extend(a)
+        other += o
+    return arrays, other
+
+
+class _BufferCounter(object):
+    """
+    Count bytes of memory used by arrays, counting memory shared by
+    several arrays only once.
+
+    """
+    def __init__(self):
+        # sorted, non-overlapping (low, high) address ranges
+        self._ranges = []
+
+    def count(self, arrays):
         """
-        Remove cached results from this table's computed columns.
+        Add arrays to the memory already counted.
+
+        Returns
+        -------
+        new : int
+            Bytes not counted before.
+        shared : int
+            Bytes already counted for earlier arrays.
 
         """
-        _TABLE_CACHE.pop(self.name, None)
-        for col in _columns_for_table(self.name).values():
-            col.clear_cached()
-        logger.debug('cleared cached columns for table {!r}'.format(self.name))
+        new = shared = 0
+        for array in arrays:
+            if array.size == 0:
+                continue
+            low, high = _byte_bounds(array)
+            overlap = sum(
+                max(0, min(high, h) - max(low, lo))
+                for lo, h in self._ranges)
+            new += high - low - overlap
+            shared += overlap
+            self._add(low, high)
+        return new, shared
+
+    def _add(self, low, high):
+        merged = []
+        for lo, h in self._ranges:
+            if h < low or lo > high:
+                merged.append((lo, h))
+            else:
+                low, high = min(low, lo), max(high, h)
+        merged.append((low, high))
+        self._ranges = sorted(merged)
 
 
-class TableFuncWrapper(object):
+def memory_report():
     """
-    Wrap a function that provides a DataFrame.
+    Report the memory used by the data held in Orca.
+
+    Memory is reported per table column, cached value, and injectable.
+    Memory shared by several entries, like a cached column that is a
+    view of a table's column, is only counted for the first entry
+    where it is found, in the order listed below.
+
+    Returns
+    -------
+    report : pandas.DataFrame
+        With one row per entry and columns:
+
+        - kind: 'local' for the columns and index of registered
+          DataFrames, 'series' for registered Series columns,
+          'table_cache', 'column_cache', and 'injectable_cache' for
+          cached function results, 'injectable' for other registered
+          values, and 'memoized' for results of memoized injectables
+        - table: table name, if any
+        - name: column, table, or injectable name
+        - nbytes: bytes first counted for this entry
+        - shared_nbytes: bytes this entry shares with earlier ones
+
+    """
+    entries = []
+    for table in _TABLES.values():
+        if isinstance(table, DataFrameWrapper):
+            entries.append(('local', table.name, '<index>', [table.index]))
+            entries.extend(
+                ('local', table.name, c, [table._local_column(c)])
+                for c in table.local_columns)
+    for (table_name, column_name), col in _COLUMNS.items():
+        if isinstance(col, _SeriesWrapper):
+            entries.append(('series', table_name, column_name, [col()]))
+    entries.extend(
+        ('table_cache', name, name, [item.value])
+        for name, item in list(_TABLE_CACHE.items()))
+    entries.extend(
+        ('column_cache', key[0], key[1], [item.value])
+        for key, item in list(_COLUMN_CACHE.items()))
+    entries.extend(
+        ('injectable_cache', None, name, [item.value])
+        for name, item in list(_INJECTABLE_CACHE.items()))
+    entries.extend(
+        ('injectable', None, name, [value])
+        for name, value in _INJECTABLES.items()
+        if not isinstance(value, Callable))
+    entries.extend(
+        ('memoized', None, name, list(item.value.cache.values()))
+        for name, item in _MEMOIZED.items())
+
+    counter = _BufferCounter()
+    rows = []
+    for kind, table_name, name, values in entries:
+        arrays = []
+        other = 0
+        for value in values:
+            a, o = _value_buffers(value)
+            arrays.extend(a)
+            other += o
+        new, shared = counter.count(arrays)
+        rows.append((kind, table_name, name, new + other, shared))
+
+    return pd.DataFrame(rows, columns=[
+        'kind', 'table', 'name', 'nbytes', 'shared_nbytes'])
+
+
+def _is_cached(cache, key, argspec):
+    """
+    Whether a valid value is cached for a wrapped function.
+    Values cached with the 'auto' scope are dropped if any of the
+    function's inputs have changed since they were stored.
 
     Parameters
     ----------
-    name : str
-        Name for the table.
-    func : callable
-        Callable that returns a DataFrame.
-    cache : bool, optional
-        Whether to cache the results of calling the wrapped function.
-    cache_scope : {'step', 'iteration', 'forever'}, optional
-        Scope for which to cache data. Default is to cache forever
-        (or until manually cleared). 'iteration' caches data for each
-        complete iteration of the pipeline, 'step' caches data for
-        a single step of the pipeline.
-    copy_col : bool, optional
-        Whether to return copies when evaluating columns.
+    cache : dict
+    key : str or tuple
+    argspec : FullArgSpec or ArgSpec
+        Argspec of the wrapped function.
 
-    Attributes
-    ----------
-    name : str
-        Table name.
-    cache : bool
-        Whether caching is enabled for this table.
-    copy_col : bool
-        Whether to return copies when evaluating columns.
+    Returns
+    -------
+    cached : bool
 
     """
-    def __init__(
-            self, name, func, cache=False, cache_scope=_CS_FOREVER,
-            copy_col=True):
-        self.name = name
-        self._func = func
-        self._argspec = getargspec(func)
-        self.cache = cache
-        self.cache_scope = cache_scope
-        self.copy_col = copy_col
-        self._columns = []
-        self._index = None
-        self._len = 0
+    with _CACHE_LOCK:
+        item = cache.get(key)
+        if item is None:
+            return False
+        if (item.scope == _CS_AUTO and
+                item.versions != _argspec_versions(argspec)):
+            _pop_cached(cache, key)
+            logger.debug(
+                'inputs of {!r} changed, removed from cache'.format(key))
+            return False
+        return True
 
-    @property
-    def columns(self):
-        """
-        Columns in this table. (May contain only computed columns
-        if the wrapped function has not been called yet.)
 
-        """
-        return self._columns + list_columns_for_table(self.name)
+def _cache_lookup(kind, cache, key, argspec):
+    """
+    Return a valid cached value for a wrapped function, checking for
+    and reading the value under one lock so that other threads cannot
+    evict it in between.
 
-    @property
-    def local_columns(self):
-        """
-        Only the columns contained in the DataFrame returned by the
-        wrapped function. (No registered columns included.)
+    Parameters
+    ----------
+    kind : {'table', 'column', 'injectable'}
+    cache : dict
+    key : str or tuple
+    argspec : FullArgSpec or ArgSpec
 
-        """
-        if self._columns:
-            return self._columns
-        else:
-            self._call_func()
-            return self._columns
+    Returns
+    -------
+    found : bool
+    value : object
+        None if no valid value is cached.
 
-    @property
-    def index(self):
+    """
+    with _CACHE_LOCK:
+        if not _is_cached(cache, key, argspec):
+            return False, None
+        return True, _cache_hit(kind, cache, key)
+
+
+def _cache_store(kind, cache, key, value, scope, cost, argspec):
+    """
+    Store a value in one of the caches and evict other values
+    if the cache budget is exceeded.
+
+    Parameters
+    ----------
+    kind : {'table', 'column', 'injectable'}
+    cache : dict
+    key : str or tuple
+    value : object
+    scope : str
+    cost : float
+        Seconds it took to compute `value`.
+    argspec : FullArgSpec or ArgSpec
+        Argspec of the wrapped function, used to record input versions
+        for the 'auto' scope.
+
+    """
+    global _CACHE_CLOCK
+    nbytes = _value_nbytes(value) if _CACHE_BUDGET is not None else 0
+    with _CACHE_LOCK:
+        versions = (
+            _argspec_versions(argspec) if scope == _CS_AUTO else None)
+        cache[key] = CacheItem(key, value, scope, nbytes, cost, versions)
+        _CACHE_CLOCK += 1
+        _CACHE_LAST_USED[(kind, key)] = _CACHE_CLOCK
+        _enforce_cache_budget()
+
+
+def _enforce_cache_budget():
+    """
+    Evict cached values until the cache fits in the budget.
+    Must be called with `_CACHE_LOCK` held.
+
+    """
+    if _CACHE_BUDGET is None:
+        return
+
+    entries = [(kind, key, item)
+               for kind, cache in _caches()
+               for key, item in cache.items()]
+    total = sum(item.nbytes for _, _, item in entries)
+    if total <= _CACHE_BUDGET:
+        return
+
+    if _CACHE_POLICY == 'lru':
+        def priority(entry):
+            return _CACHE_LAST_USED.get(entry[:2], 0)
+    else:
+        def priority(entry):
+            return entry[2].cost / max(entry[2].nbytes, 1)
+
+    caches = dict(_caches())
+    for kind, key, item in sorted(entries, key=priority):
+        if total <= _CACHE_BUDGET:
+            break
+        if not item.nbytes or kind == 'table':
+            # tables are not evicted or spilled because steps may
+            # update the cached DataFrameWrapper in place
+            continue
+
+        spilled = None
+        if _SPILL_DIR is not None:
+            spilled = _SpilledValue.spill(item.value, _SPILL_DIR)
+
+        if spilled is None:
+            caches[kind].pop(key, None)
+            _CACHE_LAST_USED.pop((kind, key), None)
+            action = 'evicted'
+        else:
+            caches[kind][key] = item._replace(value=spilled, nbytes=0)
+            action = 'spilled'
+
+        _stats_for(kind, key)['evictions'] += 1
+        total -= item.nbytes
+        logger.debug(
+            '{} {} {!r} ({} bytes) from cache to fit budget '
+            'of {} bytes'.format(
+                action, kind, key, item.nbytes, _CACHE_BUDGET))
+
+
+def set_cache_spill(directory=None):
+    """
+    Write cached values evicted to fit the cache budget to files in
+    a local directory instead of discarding them.
+
+    Spilled values are memory-mapped from their files when they are
+    next requested, so they do not need to be recomputed. Only Series,
+    DataFrames, and arrays with numeric or boolean data can be spilled;
+    other values are discarded as usual. Cached tables are never spilled.
+    Files are deleted when their values are cleared from the cache,
+    for example when their cache scope ends.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Directory for spill files. Will be created if it does not exist.
+        None (the default) turns off spilling.
+
+    """
+    global _SPILL_DIR
+
+    if directory is not None and not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    _SPILL_DIR = directory
+    logger.debug('cache spill directory set to {!r}'.format(directory))
+
+
+class _SpilledValue(object):
+    """
+    Handle for a cached value that has been written to disk.
+
+    Parameters
+    ----------
+    path : str
+        Directory containing the spilled data.
+    kind : {'series', 'frame', 'array'}
+    meta : dict
+        Index, names, and columns needed to rebuild the value.
+
+    """
+    def __init__(self, path, kind, meta):
+        self.path = path
+        self.kind = kind
+        self.meta = meta
+
+    @staticmethod
+    def _spillable(arr):
+        return isinstance(arr, np.ndarray) and arr.dtype.kind in 'biufcmM'
+
+    @classmethod
+    def spill(cls, value, directory):
         """
-        Index of the underlying table. Will be None if that index is
-        unknown.
+        Write a value to a new subdirectory of `directory`.
+
+        Returns
+        -------
+        spilled : _SpilledValue or None
+            None if the value cannot be spilled.
 
         """
-        return self._index
+        if isinstance(value, pd.Series):
+            kind = 'series'
+            arrays = [value.values]
+            meta = {'index': value.index, 'name': value.name}
+        elif isinstance(value, pd.DataFrame):
+            kind = 'frame'
+            arrays = [value.iloc[:, i].values for i in range(value.shape[1])]
+            meta = {'index': value.index, 'columns': value.columns}
+        elif isinstance(value, np.ndarray):
+            kind = 'array'
+            arrays = [value]
+            meta = {}
+        else:
+            return None
 
-    def _call_func(self):
+        if not all(cls._spillable(arr) for arr in arrays):
+            return None
+
+        path = tempfile.mkdtemp(dir=directory)
+        for i, arr in enumerate(arrays):
+            np.save(os.path.join(path, '{}.npy'.format(i)), arr)
+        meta['n'] = len(arrays)
+        return cls(path, kind, meta)
+
+    def load(self):
         """
-        Call the wrapped function and return the result wrapped by
-        DataFrameWrapper.
-        Also updates attributes like columns, index, and length.
+        Rebuild the spilled value backed by memory-mapped files.
+        Changes to the returned value are not written back to disk.
 
         """
-        if _CACHING and self.cache and self.name in _TABLE_CACHE:
-            logger.debug('returning table {!r} from cache'.format(self.name))
-            return _TABLE_CACHE[self.name].value
+        arrays = [
+            np.load(os.path.join(self.path, '{}.npy'.format(i)),
+                    mmap_mode='c')
+            for i in range(self.meta['n'])]
+
+        if self.kind == 'series':
+            return pd.Series(
+                arrays[0], index=self.meta['index'], name=self.meta['name'])
+        elif self.kind == 'frame':
+            frame = pd.DataFrame(
+                dict(enumerate(arrays)), index=self.meta['index'])
+            frame.columns = self.meta['columns']
+            return frame
+        else:
+            return arrays[0]
 
-        with log_start_finish(
-                'call function to get frame for table {!r}'.format(
-                    self.name),
-                logger):
-            kwargs = _collect_variables(names=self._argspec.args,
-                                        expressions=self._argspec.defaults)
-            frame = self._func(**kwargs)
+    def remove(self):
+        """
+        Delete the spill files.
 
-        self._columns = list(frame.columns)
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def _pop_cached(cache, key):
+    """
+    Remove a value from a cache, deleting its spill files if it
+    has been spilled to disk.
+
+    Returns
+    -------
+    item : CacheItem or None
+
+    """
+    with _CACHE_LOCK:
+        item = cache.pop(key, None)
+    if item is not None and isinstance(item.value, _SpilledValue):
+        item.value.remove()
+    return item
+
+
+def _clear_spilled():
+    """
+    Delete the spill files of all spilled cache values.
+
+    """
+    for _, cache in _caches():
+        for item in cache.values():
+            if isinstance(item.value, _SpilledValue):
+                item.value.remove()
+
+
+def set_disk_cache(directory=None):
+    """
+    Store the results of forever-scoped cached table and column functions
+    in a local directory so that they can be reused by later Python
+    processes.
+
+    Entries are keyed by the source code of the registered function and
+    the values of its injected inputs. When a function's source or inputs
+    change a new entry is written. Changes that are not visible in either,
+    for example to module-level globals read by the function, are
+    not detected.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Directory in which to store cached results. Will be created
+        if it does not exist. None (the default) turns off the disk cache.
+
+    """
+    global _DISK_CACHE_DIR
+
+    if directory is not None and not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    _DISK_CACHE_DIR = directory
+    logger.debug('disk cache directory set to {!r}'.format(directory))
+
+
+def get_disk_cache():
+    """
+    The directory used for the disk cache, None if it is turned off.
+
+    """
+    return _DISK_CACHE_DIR
+
+
+def clear_disk_cache():
+    """
+    Remove all entries from the disk cache directory, including
+    partially written ones.
+
+    """
+    if _DISK_CACHE_DIR is None:
+        return
+
+    for fname in os.listdir(_DISK_CACHE_DIR):
+        if fname.endswith(('.h5', '.tmp')):
+            os.remove(os.path.join(_DISK_CACHE_DIR, fname))
+    logger.debug('disk cache cleared')
+
+
+def _fingerprint(value, hasher, seen=None):
+    """
+    Update a hashlib hash object with the contents of an injected value.
+
+    Parameters
+    ----------
+    value : object
+    hasher : hashlib hash object
+    seen : set of str, optional
+        Expressions already fingerprinted, used to break cycles such
+        as a column that is injected its own table.
+
+    """
+    if isinstance(value, DataFrameWrapper):
+        seen = set() if seen is None else seen
+        seen.add(value.name)
+        _fingerprint(value.local, hasher)
+        for name, col in sorted(_columns_for_table(value.name).items()):
+            hasher.update(name.encode('utf-8'))
+            if isinstance(col, _ColumnFuncWrapper):
+                _fingerprint_func(col, hasher, seen)
+            else:
+                _fingerprint(col(), hasher)
+    elif isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        hasher.update(type(value).__name__.encode('utf-8'))
+        if isinstance(value, pd.DataFrame):
+            hasher.update(repr(list(value.columns)).encode('utf-8'))
+            hasher.update(repr(list(value.dtypes)).encode('utf-8'))
+        else:
+            hasher.update(repr((value.name, value.dtype)).encode('utf-8'))
+        hasher.update(
+            pd.util.hash_pandas_object(value).values.tobytes())
+    elif hasattr(value, 'tobytes') and hasattr(value, 'dtype'):
+        hasher.update(repr((value.dtype, value.shape)).encode('utf-8'))
+        hasher.update(value.tobytes())
+    else:
+        hasher.update(pickle.dumps(value, protocol=2))
+
+
+def _fingerprint_func(wrapper, hasher, seen):
+    """
+    Update a hashlib hash object with the source of a computed column
+    and, recursively, the inputs it would be injected, without
+    evaluating the column itself.
+
+    Parameters
+    ----------
+    wrapper : _ColumnFuncWrapper
+    hasher : hashlib hash object
+    seen : set of str
+        Expressions already fingerprinted.
+
+    """
+    hasher.update(wrapper.func_source_data()[2].encode('utf-8'))
+    for expr in _argspec_expressions(wrapper._argspec):
+        hasher.update(expr.encode('utf-8'))
+        if expr in seen:
+            continue
+        seen.add(expr)
+        if '.' in expr:
+            table_name, column_name = expr.split('.')
+            col = _COLUMNS.get((table_name, column_name))
+            if isinstance(col, _ColumnFuncWrapper):
+                _fingerprint_func(col, hasher, seen)
+            else:
+                _fingerprint(get_table(table_name)[column_name], hasher)
+        elif expr in _TABLES:
+            _fingerprint(get_table(expr), hasher, seen)
+        else:
+            _fingerprint(get_injectable(expr), hasher, seen)
+
+
+def _disk_cache_path(wrapper, kwargs):
+    """
+    Path of the disk cache entry for calling a wrapped function with
+    the given inputs. Returns None if the function source or inputs
+    cannot be fingerprinted.
+
+    """
+    if isinstance(wrapper, TableFuncWrapper):
+        name = 'table-{}'.format(wrapper.name)
+    else:
+        name = 'column-{}-{}'.format(wrapper.table_name, wrapper.name)
+
+    hasher = hashlib.sha1(name.encode('utf-8'))
+    try:
+        hasher.update(wrapper.func_source_data()[2].encode('utf-8'))
+        for arg in sorted(kwargs):
+            hasher.update(arg.encode('utf-8'))
+            _fingerprint(kwargs[arg], hasher)
+    except (IOError, OSError, TypeError, pickle.PicklingError):
+        logger.debug(
+            'unable to fingerprint {}, skipping disk cache'.format(name))
+        return None
+
+    return os.path.join(
+        _DISK_CACHE_DIR, '{}-{}.h5'.format(name, hasher.hexdigest()))
+
+
+def _call_func_disk_cached(wrapper, kwargs):
+    """
+    Call a wrapped table or column function, using the disk cache
+    if it is turned on and the wrapper is cached forever.
+
+    Parameters
+    ----------
+    wrapper : TableFuncWrapper or _ColumnFuncWrapper
+    kwargs : dict
+        Injected arguments.
+
+    """
+    if (_DISK_CACHE_DIR is None or not _CACHING or not wrapper.cache or
+            wrapper.cache_scope != _CS_FOREVER):
+        return _evaluate_func(wrapper, kwargs)
+
+    path = _disk_cache_path(wrapper, kwargs)
+    if path is None:
+        return _evaluate_func(wrapper, kwargs)
+
+    if os.path.exists(path):
+        logger.debug('loading {!r} from disk cache'.format(path))
+        return pd.read_hdf(path, 'value')
+
+    result = _evaluate_func(wrapper, kwargs)
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        # write to a temporary file first so other processes never
+        # read a partial entry
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            result.to_hdf(tmp_path, key='value', mode='w')
+            os.rename(tmp_path, path)
+        except Exception:
+            # e.g. data types HDF5 fixed format cannot store
+            logger.debug(
+                'unable to write {!r} to disk cache'.format(path),
+                exc_info=True)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        else:
+            logger.debug('wrote {!r} to disk cache'.format(path))
+
+    return result
+
+
+def _column_values(series):
+    """
+    The values of a Series as a contiguous numpy array, or as its
+    extension array (such as Arrow-backed data).
+
+    """
+    if isinstance(series.dtype, np.dtype):
+        return np.ascontiguousarray(series.to_numpy())
+    return series.array
+
+
+def _pandas_copy_on_write():
+    """
+    Whether pandas' copy-on-write mode is enabled.
+
+    """
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    try:
+        return pd.get_option('mode.copy_on_write') is True
+    except KeyError:  # pandas < 1.5
+        return False
+
+
+def _cow_column(series):
+    """
+    Return a Series sharing data with `series` that cannot be used
+    to modify it.
+
+    """
+    if _pandas_copy_on_write():
+        return series.copy(deep=False)
+
+    if not isinstance(series.dtype, np.dtype):
+        # extension arrays have no read-only flag
+        return series.copy()
+
+    values = series.to_numpy().view()
+    values.flags.writeable = False
+    return pd.Series(values, index=series.index, name=series.name, copy=False)
+
+
+# for errors that occur during Orca runs
+class OrcaError(Exception):
+    pass
+
+
+class DataFrameWrapper(object):
+    """
+    Wraps a DataFrame so it can provide certain columns and handle
+    computed columns.
+
+    Parameters
+    ----------
+    name : str
+        Name for the table.
+    frame : pandas.DataFrame
+    copy_col : bool or 'cow', optional
+        Whether to return copies when evaluating columns. 'cow'
+        returns read-only views that are only copied when written to,
+        see `DataFrameWrapper.get_column`.
+    storage : {'frame', 'columns'}, optional
+        How the table's data is stored. 'frame' keeps the DataFrame.
+        'columns' keeps a separate array for each column and builds
+        DataFrames when needed, so adding and replacing columns does
+        not fragment or copy a DataFrame. Column names must be unique.
+
+    Attributes
+    ----------
+    name : str
+        Table name.
+    copy_col : bool or 'cow'
+        Whether to return copies when evaluating columns.
+    storage : str
+        How the table's data is stored.
+    local : pandas.DataFrame
+        The wrapped DataFrame. With 'columns' storage this is built
+        from the column arrays (without copying them) each time it is
+        accessed, so modifying it does not modify the table.
+    version : int
+        Changes whenever columns are added or updated through
+        this wrapper.
+
+    """
+    def __init__(self, name, frame, copy_col=True, storage='frame'):
+        if storage not in _STORAGES:
+            raise ValueError('unknown storage {!r}'.format(storage))
+        self.name = name
+        self.storage = storage
+        self.local = frame
+        self.copy_col = copy_col
+        self.version = self._base_version = next(_VERSIONS)
+        self._column_versions = {}
+        self._positions_cache = None
+
+    @property
+    def local(self):
+        if self._arrays is None:
+            return self._frame
+        return pd.DataFrame(self._arrays, index=self._index, copy=False)
+
+    @local.setter
+    def local(self, frame):
+        if self.storage == 'frame':
+            self._frame = frame
+            self._arrays = None
+            return
+
+        if not frame.columns.is_unique:
+            raise ValueError(
+                'column names must be unique for {!r} storage'.format(
+                    self.storage))
+        self._frame = None
         self._index = frame.index
-        self._len = len(frame)
+        self._arrays = {c: _column_values(frame[c]) for c in frame.columns}
 
-        wrapped = DataFrameWrapper(self.name, frame, copy_col=self.copy_col)
+    def _local_column(self, column_name):
+        if self._arrays is None:
+            return self._frame[column_name]
+        return pd.Series(
+            self._arrays[column_name], index=self._index, name=column_name,
+            copy=False)
 
-        if self.cache:
-            _TABLE_CACHE[self.name] = CacheItem(
-                self.name, wrapped, self.cache_scope)
+    @property
+    def columns(self):
+        """
+        Columns in this table.
 
-        return wrapped
+        """
+        return self.local_columns + list_columns_for_table(self.name)
 
-    def __call__(self):
-        return self._call_func()
+    @property
+    def local_columns(self):
+        """
+        Columns that are part of the wrapped DataFrame.
 
-    def to_frame(self, columns=None):
         """
-        Make a DataFrame with the given columns.
+        if self._arrays is None:
+            return list(self._frame.columns)
+        return list(self._arrays)
+
+    @property
+    def index(self):
+        """
+        Table index.
+
+        """
+        if self._arrays is None:
+            return self._frame.index
+        return self._index
 
-        Will always return a copy of the underlying table.
+    def to_frame(self, columns=None, workers=None, copy=True):
+        """
+        Make a DataFrame with the given columns.
 
         Parameters
         ----------
-        columns : sequence, optional
-            Sequence of the column names desired in the DataFrame.
-            If None all columns are returned.
+        columns : sequence or string, optional
+            Sequence of the column names desired in the DataFrame. A string
+            can also be passed if only one column is desired.
+            If None all columns are returned, including registered columns.
+        workers : int, optional
+            Number of threads used to compute registered columns that
+            do not depend on each other. Defaults to the value set with
+            `set_column_workers`.
+        copy : bool, optional
+            Whether to copy the data. If False the returned DataFrame
+            shares memory with the underlying table and cached columns,
+            so it must not be modified.
 
         Returns
         -------
         frame : pandas.DataFrame
 
         """
-        return self._call_func().to_frame(columns)
+        extra_cols = _columns_for_table(self.name)
 
-    def get_column(self, column_name):
+        if columns is not None:
+            columns = [columns] if isinstance(columns, str) else columns
+            columns = set(columns)
+            local_cols = [
+                c for c in self.local_columns
+                if c in columns and c not in extra_cols]
+            extra_cols = {
+                k: c for k, c in extra_cols.items() if k in columns}
+        else:
+            local_cols = self.local_columns
+
+        with log_start_finish(
+                'computing {!r} columns for table {!r}'.format(
+                    len(extra_cols), self.name),
+                logger):
+            computed = _compute_columns(self.name, extra_cols, workers)
+
+        if self._arrays is None and not self._frame.columns.is_unique:
+            df = self._frame[local_cols]
+            df = df.copy() if copy else df
+            for name in extra_cols:
+                df[name] = computed[name]
+            return df
+
+        # assemble all columns at once rather than inserting them
+        # one by one into a copy of the table
+        # the column index is given explicitly so that its type and
+        # order match the table's, even if there are no columns
+        if self._arrays is None:
+            data = {c: self._frame[c] for c in local_cols}
+            names = self._frame.columns[
+                self._frame.columns.get_indexer(local_cols)]
+        else:
+            data = {c: self._arrays[c] for c in local_cols}
+            names = pd.Index(local_cols)
+        if extra_cols:
+            names = names.append(pd.Index(list(extra_cols)))
+        data.update((name, computed[name]) for name in extra_cols)
+        return pd.DataFrame(data, index=self.index, columns=names, copy=copy)
+
+    def update_col(self, column_name, series):
         """
-        Returns a column as a Series.
+        Add or replace a column in the underlying DataFrame.
+        Cached values that depend on the column are cleared.
 
         Parameters
         ----------
         column_name : str
-
-        Returns
-        -------
-        column : pandas.Series
+            Column to add or replace.
+        series : pandas.Series or sequence
+            Column data.
 
         """
-        frame = self._call_func()
-        return DataFrameWrapper(self.name, frame,
-                                copy_col=self.copy_col).get_column(column_name)
-
-    def __getitem__(self, key):
-        return self.get_column(key)
-
-    def __getattr__(self, key):
-        return self.get_column(key)
+        logger.debug('updating column {!r} in table {!r}'.format(
+            column_name, self.name))
+        if self._arrays is None:
+            self._frame[column_name] = series
+        else:
+            # align like DataFrame.__setitem__, then keep the array
+            if not isinstance(series, pd.Series):
+                series = pd.Series(series, index=self._index)
+            elif not series.index.equals(self._index):
+                series = series.reindex(self._index)
+            self._arrays[column_name] = _column_values(series)
+        self.version = self._column_versions[column_name] = next(_VERSIONS)
+        _invalidate_dependents(self.name, column_name)
 
-    def __len__(self):
-        return self._len
+    def __setitem__(self, key, value):
+        return self.update_col(key, value)
 
-    def column_type(self, column_name):
+    def get_column(self, column_name):
         """
-        Report column type as one of 'local', 'series', or 'function'.
+        Returns a column as a Series.
+
+        If the table's `copy_col` is True the Series is a copy. If it is
+        'cow' the Series shares its data with the table. With pandas'
+        copy-on-write mode enabled, writing to it makes a copy. Otherwise
+        its array is read-only, so modifying it in place raises an error
+        and callers that need to must copy it first. Later updates to
+        the table write to new arrays, so the Series keeps its values.
+
+        Parameters
+        ----------
+        column_name : str
+
+        Returns
+        -------
+        column : pandas.Series
+
+        """
+        with log_start_finish(
+                'getting single column {!r} from table {!r}'.format(
+                    column_name, self.name),
+                logger):
+            extra_cols = _columns_for_table(self.name)
+            if column_name in extra_cols:
+                with log_start_finish(
+                        'computing column {!r} for table {!r}'.format(
+                            column_name, self.name),
+                        logger):
+                    column = extra_cols[column_name]()
+            else:
+                column = self._local_column(column_name)
+            if self.copy_col == 'cow':
+                return _cow_column(column)
+            elif self.copy_col:
+                return column.copy()
+            else:
+                return column
+
+    def __getitem__(self, key):
+        return self.get_column(key)
+
+    def __getattr__(self, key):
+        return self.get_column(key)
+
+    def column_type(self, column_name):
+        """
+        Report column type as one of 'local', 'series', or 'function'.
 
         Parameters
         ----------
@@ -725,422 +1574,1889 @@ class TableFuncWrapper(object):
 
         raise KeyError('column {!r} not found'.format(column_name))
 
+    def update_col_from_series(self, column_name, series, cast=False):
+        """
+        Update existing values in a column from another series.
+        Index values must match in both column and series. Optionally
+        casts data type to match the existing column. Cached values that
+        depend on the column are cleared.
+
+        Integer values are always cast to integer columns of another
+        width, such as those of compacted tables. A ValueError is raised
+        rather than casting values that do not fit in an integer column.
+
+        Rows are located by position, and the positions for the last
+        index updated from are kept, so repeated updates from the same
+        index do not look up its labels again.
+
+        Parameters
+        ---------------
+        column_name : str
+        series : panas.Series
+        cast: bool, optional, default False
+        """
+        logger.debug('updating column {!r} in table {!r}'.format(
+            column_name, self.name))
+
+        series = self._check_update_dtype(column_name, series, cast)
+        self._write_positions(
+            self._update_positions(series.index),
+            {column_name: series})
+        self.version = self._column_versions[column_name] = next(_VERSIONS)
+        _invalidate_dependents(self.name, column_name)
+
+    def update_cols_from_frame(self, frame, cast=False):
+        """
+        Update existing values in several columns from a DataFrame.
+        Like `update_col_from_series` for each column of `frame`, but
+        the rows of `frame` are located in the table once for all of
+        them and dependent cached values are cleared in one pass.
+        Nothing is updated if any column fails the type check.
+
+        Parameters
+        ----------
+        frame : pandas.DataFrame
+            Columns to update. Index values must be in the table's index.
+        cast : bool, optional, default False
+            Whether to cast data types to match the existing columns.
+
+        """
+        if not frame.columns.is_unique:
+            raise ValueError('frame column names must be unique')
+        logger.debug('updating columns {!r} in table {!r}'.format(
+            list(frame.columns), self.name))
+
+        updates = {
+            c: self._check_update_dtype(c, frame[c], cast)
+            for c in frame.columns}
+        self._write_positions(self._update_positions(frame.index), updates)
+        version = self.version = next(_VERSIONS)
+        for c in updates:
+            self._column_versions[c] = version
+        _invalidate_nodes(
+            [('table', self.name)] +
+            [('column', self.name, c) for c in updates])
+
+    def _check_update_dtype(self, column_name, series, cast):
+        col_dtype = self._local_column(column_name).dtype
+        if series.dtype == col_dtype:
+            return series
+
+        # integers of other widths are accepted without `cast`,
+        # e.g. for columns stored with smaller types by compact_frame
+        ints = (
+            isinstance(col_dtype, np.dtype) and col_dtype.kind in 'iu' and
+            pd.api.types.is_numeric_dtype(series.dtype) and
+            not pd.api.types.is_bool_dtype(series.dtype))
+        if not cast and not (
+                ints and pd.api.types.is_integer_dtype(series.dtype)):
+            err_msg = "Data type mismatch, existing:{}, update:{}"
+            err_msg = err_msg.format(col_dtype, series.dtype)
+            raise ValueError(err_msg)
+        if ints and not _fits_int_dtype(series, col_dtype):
+            raise ValueError(
+                'values updating column {!r} do not fit in its data '
+                'type {}'.format(column_name, col_dtype))
+        return series.astype(col_dtype)
+
+    def positions(self, labels):
+        """
+        Positions of index labels in this table, like
+        ``table.index.get_indexer(labels)``.
+
+        The table index keeps the hash table built by its first lookup
+        and the positions for the last `labels` Index are kept as well,
+        so repeated lookups against the same table do no more hashing
+        than needed until the table index is replaced.
+
+        Parameters
+        ----------
+        labels : pandas.Index or sequence
+            Labels to look up. The table index must be unique.
+
+        Returns
+        -------
+        positions : numpy.ndarray
+            Read-only array of integer positions, -1 where a label is
+            not in the index.
+
+        """
+        index = self.index
+        cached = self._positions_cache
+        # Index.is_ also matches shallow copies, which pandas may
+        # make of the table index when columns are written
+        if (cached is not None and cached[0].is_(index) and
+                isinstance(labels, pd.Index) and cached[1].is_(labels)):
+            return cached[2]
+
+        positions = index.get_indexer(labels)
+        positions.flags.writeable = False
+        # other sequences can be changed in place, so can't be reused
+        if isinstance(labels, pd.Index):
+            self._positions_cache = (index, labels, positions)
+        return positions
+
+    def _update_positions(self, labels):
+        """
+        Positions in the table of index `labels` for updating columns,
+        or None if the table index has duplicates and updates have to
+        go through ``.loc``.
+
+        """
+        index = self.index
+        if self._arrays is None and not index.is_unique:
+            return None
+        if labels is index or (
+                len(labels) == len(index) and labels.equals(index)):
+            return slice(None)
+
+        positions = self.positions(labels)
+        if (positions == -1).any():
+            raise KeyError(
+                'index values not found in table {!r}'.format(self.name))
+        return positions
+
+    def _write_positions(self, positions, updates):
+        if self._arrays is not None:
+            for column_name, series in updates.items():
+                # write to a new array, the old one may be shared by
+                # cached values or views handed out earlier
+                values = self._arrays[column_name].copy()
+                values[positions] = _column_values(series)
+                self._arrays[column_name] = values
+            return
+
+        columns = self._frame.columns
+        for column_name, series in updates.items():
+            if self.copy_col == 'cow' and positions is not None and \
+                    columns.is_unique:
+                # write to a new array, the old one may be shared by
+                # columns handed out earlier
+                values = _column_values(self._frame[column_name]).copy()
+                values[positions] = _column_values(series)
+                self._frame[column_name] = values
+            elif positions is None or not columns.is_unique:
+                if self.copy_col == 'cow' and columns.is_unique:
+                    self._frame[column_name] = \
+                        self._frame[column_name].copy()
+                self._frame.loc[series.index, column_name] = series
+            elif isinstance(positions, slice):
+                self._frame[column_name] = series.array
+            else:
+                self._frame.iloc[positions, columns.get_loc(column_name)] = \
+                    series.array
+
+    def __len__(self):
+        return len(self.index)
+
     def clear_cached(self):
         """
-        Remove this table's cached result and that of associated columns.
+        Remove cached results from this table's computed columns.
 
         """
-        _TABLE_CACHE.pop(self.name, None)
+        _pop_cached(_TABLE_CACHE, self.name)
         for col in _columns_for_table(self.name).values():
             col.clear_cached()
-        logger.debug(
-            'cleared cached result and cached columns for table {!r}'.format(
-                self.name))
+        logger.debug('cleared cached columns for table {!r}'.format(self.name))
 
-    def func_source_data(self):
+
+class TableFuncWrapper(object):
+    """
+    Wrap a function that provides a DataFrame.
+
+    Parameters
+    ----------
+    name : str
+        Name for the table.
+    func : callable
+        Callable that returns a DataFrame.
+    cache : bool, optional
+        Whether to cache the results of calling the wrapped function.
+    cache_scope : {'step', 'iteration', 'forever', 'auto'}, optional
+        Scope for which to cache data. Default is to cache forever
+        (or until manually cleared). 'iteration' caches data for each
+        complete iteration of the pipeline, 'step' caches data for
+        a single step of the pipeline, 'auto' caches data until
+        one of the function's inputs changes.
+    copy_col : bool or 'cow', optional
+        Whether to return copies when evaluating columns. 'cow'
+        returns read-only views that are only copied when written to,
+        see `DataFrameWrapper.get_column`.
+    storage : {'frame', 'columns'}, optional
+        How the returned table's data is stored, see `DataFrameWrapper`.
+    compact : bool or dict, optional
+        Whether to compact the returned DataFrame, see `compact_frame`.
+
+    Attributes
+    ----------
+    name : str
+        Table name.
+    cache : bool
+        Whether caching is enabled for this table.
+    copy_col : bool or 'cow'
+        Whether to return copies when evaluating columns.
+    storage : str
+        How the returned table's data is stored.
+
+    """
+    def __init__(
+            self, name, func, cache=False, cache_scope=_CS_FOREVER,
+            copy_col=True, storage='frame', compact=False):
+        if storage not in _STORAGES:
+            raise ValueError('unknown storage {!r}'.format(storage))
+        self.name = name
+        self._func = func
+        self._compact = _compact_options(compact)
+        self._argspec = getargspec(func)
+        self.cache = cache
+        self.cache_scope = cache_scope
+        self.copy_col = copy_col
+        self.storage = storage
+        self._version = next(_VERSIONS)
+        self._columns = []
+        self._index = None
+        self._len = 0
+
+    @property
+    def columns(self):
         """
-        Return data about the wrapped function source, including file name,
-        line number, and source code.
+        Columns in this table. (May contain only computed columns
+        if the wrapped function has not been called yet.)
+
+        """
+        return self._columns + list_columns_for_table(self.name)
+
+    @property
+    def local_columns(self):
+        """
+        Only the columns contained in the DataFrame returned by the
+        wrapped function. (No registered columns included.)
+
+        """
+        if self._columns:
+            return self._columns
+        else:
+            self._call_func()
+            return self._columns
+
+    @property
+    def index(self):
+        """
+        Index of the underlying table. Will be None if that index is
+        unknown.
+
+        """
+        return self._index
+
+    def _call_func(self):
+        """
+        Call the wrapped function and return the result wrapped by
+        DataFrameWrapper.
+        Also updates attributes like columns, index, and length.
+
+        """
+        if _CACHING and self.cache:
+            found, value = _cache_lookup(
+                'table', _TABLE_CACHE, self.name, self._argspec)
+            if found:
+                logger.debug(
+                    'returning table {!r} from cache'.format(self.name))
+                return value
+
+        with log_start_finish(
+                'call function to get frame for table {!r}'.format(
+                    self.name),
+                logger):
+            t0 = time.time()
+            kwargs = _collect_variables(names=self._argspec.args,
+                                        expressions=self._argspec.defaults)
+            frame = _call_func_disk_cached(self, kwargs)
+            if self._compact is not None:
+                frame = compact_frame(frame, **self._compact)
+            cost = time.time() - t0
+        _record_miss('table', self.name, cost)
+
+        self._columns = list(frame.columns)
+        self._index = frame.index
+        self._len = len(frame)
+
+        wrapped = DataFrameWrapper(
+            self.name, frame, copy_col=self.copy_col, storage=self.storage)
+
+        if self.cache:
+            _cache_store(
+                'table', _TABLE_CACHE, self.name, wrapped, self.cache_scope,
+                cost, self._argspec)
+
+        return wrapped
+
+    def __call__(self):
+        return self._call_func()
+
+    def to_frame(self, columns=None, workers=None, copy=True):
+        """
+        Make a DataFrame with the given columns.
+
+        Parameters
+        ----------
+        columns : sequence, optional
+            Sequence of the column names desired in the DataFrame.
+            If None all columns are returned.
+        workers : int, optional
+            Number of threads used to compute registered columns that
+            do not depend on each other. Defaults to the value set with
+            `set_column_workers`.
+        copy : bool, optional
+            Whether to copy the data. If False the returned DataFrame
+            may share memory with cached values, so it must not be
+            modified.
 
         Returns
         -------
-        filename : str
-        lineno : int
-            The line number on which the function starts.
-        source : str
+        frame : pandas.DataFrame
 
         """
-        return utils.func_source_data(self._func)
+        return self._call_func().to_frame(
+            columns, workers=workers, copy=copy)
+
+    def get_column(self, column_name):
+        """
+        Returns a column as a Series.
+
+        Parameters
+        ----------
+        column_name : str
+
+        Returns
+        -------
+        column : pandas.Series
+
+        """
+        return self._call_func().get_column(column_name)
+
+    def positions(self, labels):
+        """
+        Positions of index labels in this table, see
+        `DataFrameWrapper.positions`.
+
+        Parameters
+        ----------
+        labels : pandas.Index or sequence
+
+        Returns
+        -------
+        positions : numpy.ndarray
+
+        """
+        return self._call_func().positions(labels)
+
+    def __getitem__(self, key):
+        return self.get_column(key)
+
+    def __getattr__(self, key):
+        return self.get_column(key)
+
+    def __len__(self):
+        return self._len
+
+    def column_type(self, column_name):
+        """
+        Report column type as one of 'local', 'series', or 'function'.
+
+        Parameters
+        ----------
+        column_name : str
+
+        Returns
+        -------
+        col_type : {'local', 'series', 'function'}
+            'local' means that the column is part of the registered table,
+            'series' means the column is a registered Pandas Series,
+            and 'function' means the column is a registered function providing
+            a Pandas Series.
+
+        """
+        extra_cols = list_columns_for_table(self.name)
+
+        if column_name in extra_cols:
+            col = _COLUMNS[(self.name, column_name)]
+
+            if isinstance(col, _SeriesWrapper):
+                return 'series'
+            elif isinstance(col, _ColumnFuncWrapper):
+                return 'function'
+
+        elif column_name in self.local_columns:
+            return 'local'
+
+        raise KeyError('column {!r} not found'.format(column_name))
+
+    def clear_cached(self):
+        """
+        Remove this table's cached result and that of associated columns.
+
+        """
+        _pop_cached(_TABLE_CACHE, self.name)
+        for col in _columns_for_table(self.name).values():
+            col.clear_cached()
+        logger.debug(
+            'cleared cached result and cached columns for table {!r}'.format(
+                self.name))
+
+    def func_source_data(self):
+        """
+        Return data about the wrapped function source, including file name,
+        line number, and source code.
+
+        Returns
+        -------
+        filename : str
+        lineno : int
+            The line number on which the function starts.
+        source : str
+
+        """
+        return utils.func_source_data(self._func)
+
+
+class _ColumnFuncWrapper(object):
+    """
+    Wrap a function that returns a Series.
+
+    Parameters
+    ----------
+    table_name : str
+        Table with which the column will be associated.
+    column_name : str
+        Name for the column.
+    func : callable
+        Should return a Series that has an
+        index matching the table to which it is being added.
+    cache : bool, optional
+        Whether to cache the result of calling the wrapped function.
+    cache_scope : {'step', 'iteration', 'forever', 'auto'}, optional
+        Scope for which to cache data. Default is to cache forever
+        (or until manually cleared). 'iteration' caches data for each
+        complete iteration of the pipeline, 'step' caches data for
+        a single step of the pipeline, 'auto' caches data until
+        one of the function's inputs changes.
+    executor : {None, 'process'}, optional
+        Where to evaluate the function. 'process' runs it in a pool of
+        worker processes (see `set_process_pool`), useful for
+        Python-heavy functions that hold the GIL. The function must be
+        picklable and may only take columns and injectables as
+        arguments, array data is passed through shared memory.
+        Requires Python 3.8 or later and is not available on Windows.
+
+    Attributes
+    ----------
+    name : str
+        Column name.
+    table_name : str
+        Name of table this column is associated with.
+    cache : bool
+        Whether caching is enabled for this column.
+    executor : str or None
+        Where the function is evaluated.
+
+    """
+    def __init__(
+            self, table_name, column_name, func, cache=False,
+            cache_scope=_CS_FOREVER, executor=None):
+        if executor not in _EXECUTORS:
+            raise ValueError('unknown executor {!r}'.format(executor))
+        self.table_name = table_name
+        self.name = column_name
+        self._func = func
+        self._argspec = getargspec(func)
+        self.cache = cache
+        self.cache_scope = cache_scope
+        self.executor = executor
+        self._version = next(_VERSIONS)
+
+    def __call__(self):
+        """
+        Evaluate the wrapped function and return the result.
+
+        """
+        if _CACHING and self.cache:
+            found, value = _cache_lookup(
+                'column', _COLUMN_CACHE, (self.table_name, self.name),
+                self._argspec)
+            if found:
+                logger.debug(
+                    'returning column {!r} for table {!r} from cache'.format(
+                        self.name, self.table_name))
+                return value
+
+        with log_start_finish(
+                ('call function to provide column {!r} for table {!r}'
+                 ).format(self.name, self.table_name), logger):
+            t0 = time.time()
+            kwargs = _collect_variables(names=self._argspec.args,
+                                        expressions=self._argspec.defaults)
+            col = _call_func_disk_cached(self, kwargs)
+            cost = time.time() - t0
+        _record_miss('column', (self.table_name, self.name), cost)
+
+        if self.cache:
+            _cache_store(
+                'column', _COLUMN_CACHE, (self.table_name, self.name), col,
+                self.cache_scope, cost, self._argspec)
+
+        return col
+
+    def clear_cached(self):
+        """
+        Remove any cached result of this column.
+
+        """
+        x = _pop_cached(_COLUMN_CACHE, (self.table_name, self.name))
+        if x is not None:
+            logger.debug(
+                'cleared cached value for column {!r} in table {!r}'.format(
+                    self.name, self.table_name))
+
+    def func_source_data(self):
+        """
+        Return data about the wrapped function source, including file name,
+        line number, and source code.
+
+        Returns
+        -------
+        filename : str
+        lineno : int
+            The line number on which the function starts.
+        source : str
+
+        """
+        return utils.func_source_data(self._func)
+
+
+class _SeriesWrapper(object):
+    """
+    Wrap a Series for the purpose of giving it the same interface as a
+    `_ColumnFuncWrapper`.
+
+    Parameters
+    ----------
+    table_name : str
+        Table with which the column will be associated.
+    column_name : str
+        Name for the column.
+    series : pandas.Series
+        Series with index matching the table to which it is being added.
+
+    Attributes
+    ----------
+    name : str
+        Column name.
+    table_name : str
+        Name of table this column is associated with.
+
+    """
+    def __init__(self, table_name, column_name, series):
+        self.table_name = table_name
+        self.name = column_name
+        self._column = series
+        self._version = next(_VERSIONS)
+
+    def __call__(self):
+        return self._column
+
+    def clear_cached(self):
+        """
+        Here for compatibility with `_ColumnFuncWrapper`.
+
+        """
+        pass
+
+
+class _InjectableFuncWrapper(object):
+    """
+    Wraps a function that will provide an injectable value elsewhere.
+
+    Parameters
+    ----------
+    name : str
+    func : callable
+    cache : bool, optional
+        Whether to cache the result of calling the wrapped function.
+    cache_scope : {'step', 'iteration', 'forever', 'auto'}, optional
+        Scope for which to cache data. Default is to cache forever
+        (or until manually cleared). 'iteration' caches data for each
+        complete iteration of the pipeline, 'step' caches data for
+        a single step of the pipeline, 'auto' caches data until
+        one of the function's inputs changes.
+
+    Attributes
+    ----------
+    name : str
+        Name of this injectable.
+    cache : bool
+        Whether caching is enabled for this injectable function.
+
+    """
+    def __init__(self, name, func, cache=False, cache_scope=_CS_FOREVER):
+        self.name = name
+        self._func = func
+        self._argspec = getargspec(func)
+        self.cache = cache
+        self.cache_scope = cache_scope
+
+    def __call__(self):
+        if _CACHING and self.cache:
+            found, value = _cache_lookup(
+                'injectable', _INJECTABLE_CACHE, self.name, self._argspec)
+            if found:
+                logger.debug(
+                    'returning injectable {!r} from cache'.format(self.name))
+                return value
+
+        with log_start_finish(
+                'call function to provide injectable {!r}'.format(self.name),
+                logger):
+            t0 = time.time()
+            kwargs = _collect_variables(names=self._argspec.args,
+                                        expressions=self._argspec.defaults)
+            result = _evaluate_func(self, kwargs)
+            cost = time.time() - t0
+        _record_miss('injectable', self.name, cost)
+
+        if self.cache:
+            _cache_store(
+                'injectable', _INJECTABLE_CACHE, self.name, result,
+                self.cache_scope, cost, self._argspec)
+
+        return result
+
+    def clear_cached(self):
+        """
+        Clear a cached result for this injectable.
+
+        """
+        x = _pop_cached(_INJECTABLE_CACHE, self.name)
+        if x:
+            logger.debug(
+                'injectable {!r} removed from cache'.format(self.name))
+
+
+class _StepFuncWrapper(object):
+    """
+    Wrap a step function for argument matching.
+
+    Parameters
+    ----------
+    step_name : str
+    func : callable
+    writes : sequence of str, optional
+        Names of the tables and injectables the step modifies. Columns
+        may be given as ``'table.column'``. Steps that do not declare
+        what they write are never run concurrently with other steps.
+
+    Attributes
+    ----------
+    name : str
+        Name of step.
+    writes : set of str or None
+        Names of the tables and injectables the step modifies.
+
+    """
+    def __init__(self, step_name, func, writes=None):
+        self.name = step_name
+        self._func = func
+        self._argspec = getargspec(func)
+        if writes is not None:
+            writes = {w.split('.')[0] for w in writes}
+        self.writes = writes
+
+    def __call__(self):
+        with log_start_finish('calling step {!r}'.format(self.name), logger):
+            return _evaluate_func(self, self._collect_variables())
+
+    def _collect_variables(self):
+        """
+        Collect the step's arguments. Coroutine functions that provide
+        them are awaited concurrently first.
+
+        """
+        if not _ASYNC_NODES:
+            return _collect_variables(names=self._argspec.args,
+                                      expressions=self._argspec.defaults)
+
+        levels = [
+            [f for f in level if inspect.iscoroutinefunction(f._func)]
+            for level in _func_levels(_argspec_expressions(self._argspec))]
+        if not any(levels):
+            return _collect_variables(names=self._argspec.args,
+                                      expressions=self._argspec.defaults)
+
+        prefetched = {}
+        _run_coroutine(_gather_async(levels, prefetched))
+        _ASYNC_LOCAL.prefetched = prefetched
+        try:
+            return _collect_variables(names=self._argspec.args,
+                                      expressions=self._argspec.defaults)
+        finally:
+            _ASYNC_LOCAL.prefetched = None
+
+    def _names_read(self):
+        """
+        Names of the tables and injectables read by the step, including
+        those read by the table, column, and injectable functions that
+        are evaluated to provide its arguments.
+
+        Returns
+        -------
+        names : set of str
+
+        """
+        return _names_read(self._argspec)
+
+    def _tables_used(self):
+        """
+        Tables injected into the step.
+
+        Returns
+        -------
+        tables : set of str
+
+        """
+        tables = set()
+        for name in _argspec_expressions(self._argspec):
+            parent_name = name.split('.')[0]
+            if is_table(parent_name):
+                tables.add(parent_name)
+        return tables
+
+    def func_source_data(self):
+        """
+        Return data about a step function's source, including file name,
+        line number, and source code.
+
+        Returns
+        -------
+        filename : str
+        lineno : int
+            The line number on which the function starts.
+        source : str
+
+        """
+        return utils.func_source_data(self._func)
+
+
+def is_table(name):
+    """
+    Returns whether a given name refers to a registered table.
+
+    """
+    return name in _TABLES
+
+
+def list_tables():
+    """
+    List of table names.
+
+    """
+    return list(_TABLES.keys())
+
+
+def list_columns():
+    """
+    List of (table name, registered column name) pairs.
+
+    """
+    return list(_COLUMNS.keys())
+
+
+def list_steps():
+    """
+    List of registered step names.
+
+    """
+    return list(_STEPS.keys())
+
+
+def list_injectables():
+    """
+    List of registered injectables.
+
+    """
+    return list(_INJECTABLES.keys())
+
+
+def list_broadcasts():
+    """
+    List of registered broadcasts as (cast table name, onto table name).
+
+    """
+    return list(_BROADCASTS.keys())
+
+
+def is_expression(name):
+    """
+    Checks whether a given name is a simple variable name or a compound
+    variable expression.
+
+    Parameters
+    ----------
+    name : str
+
+    Returns
+    -------
+    is_expr : bool
+
+    """
+    return '.' in name
+
+
+def _collect_variables(names, expressions=None):
+    """
+    Map labels and expressions to registered variables.
+
+    Handles argument matching.
+
+    Example:
+
+        _collect_variables(names=['zones', 'zone_id'],
+                           expressions=['parcels.zone_id'])
+
+    Would return a dict representing:
+
+        {'parcels': <DataFrameWrapper for zones>,
+         'zone_id': <pandas.Series for parcels.zone_id>}
+
+    Parameters
+    ----------
+    names : list of str
+        List of registered variable names and/or labels.
+        If mixing names and labels, labels must come at the end.
+    expressions : list of str, optional
+        List of registered variable expressions for labels defined
+        at end of `names`. Length must match the number of labels.
+
+    Returns
+    -------
+    variables : dict
+        Keys match `names`. Values correspond to registered variables,
+        which may be wrappers or evaluated functions if appropriate.
+
+    """
+    key = (tuple(names), tuple(expressions or ()))
+    plan = _PLANS.get(key)
+    if plan is None:
+        plan = _PLANS[key] = _variables_plan(names, expressions)
+
+    variables = {}
+    for label, _, thing, column_name in plan:
+        if column_name is not None:
+            # Registered variable expression refers to column.
+            if isinstance(thing, TableFuncWrapper):
+                thing = thing()
+            variables[label] = thing.get_column(column_name)
+        elif isinstance(thing, (_InjectableFuncWrapper, TableFuncWrapper)):
+            # Registered variable object is function.
+            variables[label] = thing()
+        else:
+            variables[label] = thing
+
+    return variables
+
+
+def _variables_plan(names, expressions=None):
+    """
+    Resolve the labels and expressions passed to `_collect_variables`
+    to registered objects. Plans are kept in ``_PLANS`` until
+    the registry changes.
+
+    Returns
+    -------
+    plan : tuple of tuples
+        ``(label, name, thing, column_name)`` for each label, where
+        `thing` is the registered table or injectable called `name`.
+        `column_name` is None unless the expression refers to a column.
+
+    """
+    # Map registered variable labels to expressions.
+    if not expressions:
+        expressions = []
+    offset = len(names) - len(expressions)
+    labels_map = dict(tz.concatv(
+        zip(names[:offset], names[:offset]),
+        zip(names[offset:], expressions)))
+
+    plan = []
+    for label, expression in labels_map.items():
+        # In the future, more registered variable expressions could be
+        # supported. Currently supports names of registered variables
+        # and references to table columns.
+        if '.' in expression:
+            table_name, column_name = expression.split('.')
+            plan.append(
+                (label, table_name, get_raw_table(table_name), column_name))
+        elif expression in _TABLES:
+            plan.append((label, expression, _TABLES[expression], None))
+        else:
+            plan.append((label, expression, _INJECTABLES[expression], None))
+
+    return tuple(plan)
+
+
+def _clear_plans(name):
+    """
+    Drop resolved argument plans that refer to a registered name.
+
+    """
+    for key, plan in list(_PLANS.items()):
+        if any(n == name for _, n, _, _ in plan):
+            _PLANS.pop(key, None)
+
+
+def _argspec_expressions(argspec):
+    """
+    Registered variable names and expressions an argspec will be
+    matched to, i.e. argument names without defaults followed by
+    the default values of the remaining arguments.
+
+    Parameters
+    ----------
+    argspec : FullArgSpec or ArgSpec
+
+    Returns
+    -------
+    expressions : list of str
+
+    """
+    args = list(argspec.args)
+    if argspec.defaults:
+        default_args = list(argspec.defaults)
+    else:
+        default_args = []
+    # Combine names from argument names and argument default values.
+    return args[:len(args) - len(default_args)] + default_args
+
+
+def _argspec_versions(argspec, seen=None):
+    """
+    Versions of the inputs a function with the given argspec would
+    be injected. Used to check whether values cached with the
+    'auto' scope are still valid.
+
+    Parameters
+    ----------
+    argspec : FullArgSpec or ArgSpec
+    seen : set of str, optional
+        Expressions already being versioned, used to break cycles
+        such as a column that is injected its own table.
+
+    Returns
+    -------
+    versions : tuple
+
+    """
+    seen = set() if seen is None else seen
+    return tuple(
+        _expression_version(expr, seen)
+        for expr in _argspec_expressions(argspec))
+
+
+def _expression_version(expression, seen):
+    """
+    Version of a registered variable expression. Changes whenever
+    the value injected for the expression may have changed.
+
+    Tables are versioned by their data and registered columns,
+    columns and functions by their registration and their own inputs,
+    and injectables by their registration.
+
+    Parameters
+    ----------
+    expression : str
+    seen : set of str
+
+    Returns
+    -------
+    version : tuple
+
+    """
+    if expression in seen:
+        return ()
+    seen.add(expression)
+
+    if '.' in expression:
+        table_name, column_name = expression.split('.')
+        version = _column_version(table_name, column_name, seen)
+    elif expression in _TABLES:
+        version = _table_data_version(expression, None, seen)
+        version += tuple(
+            _column_version(expression, c, seen)
+            for c in list_columns_for_table(expression))
+    else:
+        version = (_INJECTABLE_VERSIONS.get(expression),)
+        inj = _INJECTABLES.get(expression)
+        if isinstance(inj, _InjectableFuncWrapper):
+            version += _argspec_versions(inj._argspec, seen)
+
+    seen.discard(expression)
+    return version
+
+
+def _table_data_version(table_name, column_name, seen):
+    """
+    Version of the data of a table, or of one of its local columns,
+    not including registered columns.
+
+    """
+    table = _TABLES.get(table_name)
+    if table is None:
+        return (None,)
+    elif isinstance(table, TableFuncWrapper):
+        item = _TABLE_CACHE.get(table_name)
+        return (
+            table._version, _argspec_versions(table._argspec, seen),
+            _table_data_version_for(item.value, column_name)
+            if item is not None else None)
+    else:
+        return _table_data_version_for(table, column_name)
+
+
+def _table_data_version_for(table, column_name):
+    """
+    Version of a DataFrameWrapper's data, or of one of its
+    local columns if `column_name` is given.
+
+    """
+    if column_name is None:
+        return (table.version,)
+    else:
+        return (table._base_version,
+                table._column_versions.get(column_name))
+
+
+def _column_version(table_name, column_name, seen):
+    """
+    Version of a local or registered column.
+
+    """
+    col = _COLUMNS.get((table_name, column_name))
+    if col is None:
+        return _table_data_version(table_name, column_name, seen)
+    elif isinstance(col, _ColumnFuncWrapper):
+        key = '{}.{}'.format(table_name, column_name)
+        if key in seen:
+            return ()
+        seen.add(key)
+        version = (col._version, _argspec_versions(col._argspec, seen))
+        seen.discard(key)
+        return version
+    else:
+        return (col._version,)
+
+
+def _names_read(argspec):
+    """
+    Names of the tables and injectables read by a function, including
+    those read by the table, column, and injectable functions that
+    are evaluated to provide its arguments.
+
+    Parameters
+    ----------
+    argspec : inspect.FullArgSpec
+
+    Returns
+    -------
+    names : set of str
+
+    """
+    names = set()
+    seen = set()
+    expressions = list(_argspec_expressions(argspec))
+    while expressions:
+        expr = expressions.pop()
+        names.add(expr.split('.')[0])
+        funcs = _expression_funcs(expr)
+        if expr in _TABLES:
+            # columns computed when the whole table is used
+            funcs.extend(
+                c for c in _COLUMNS_BY_TABLE.get(expr, {}).values()
+                if isinstance(c, _ColumnFuncWrapper))
+        for func in funcs:
+            if func not in seen:
+                seen.add(func)
+                expressions.extend(_argspec_expressions(func._argspec))
+    return names
+
+
+def _expression_funcs(expression):
+    """
+    Registered functions that are evaluated when a variable
+    expression is injected.
+
+    Injecting a table evaluates its table function (if any) but not its
+    registered columns, which are computed lazily. Injecting a column
+    evaluates the table function and the column function.
+
+    Parameters
+    ----------
+    expression : str
+
+    Returns
+    -------
+    funcs : list of TableFuncWrapper, _ColumnFuncWrapper,
+        or _InjectableFuncWrapper
+
+    """
+    if '.' in expression:
+        table_name, column_name = expression.split('.')
+        funcs = _expression_funcs(table_name)
+        col = _COLUMNS.get((table_name, column_name))
+        if isinstance(col, _ColumnFuncWrapper):
+            funcs.append(col)
+        return funcs
+
+    thing = _TABLES.get(expression, _INJECTABLES.get(expression))
+    if isinstance(thing, (TableFuncWrapper, _InjectableFuncWrapper)):
+        return [thing]
+    return []
+
+
+def _func_levels(expressions):
+    """
+    Group the registered functions needed to evaluate some variable
+    expressions into levels, where functions in a level only depend
+    on functions in earlier levels.
+
+    Parameters
+    ----------
+    expressions : sequence of str
+
+    Returns
+    -------
+    levels : list of lists
+        Each function appears once, in the first level after all
+        of its dependencies.
+
+    """
+    depth = {}
+    order = []
+
+    def visit(func, path):
+        if func in depth:
+            return depth[func]
+        if func in path:
+            raise OrcaError(
+                'circular dependency involving {!r}'.format(func.name))
+        path.add(func)
+        deps = tz.concat(
+            _expression_funcs(expr)
+            for expr in _argspec_expressions(func._argspec))
+        depth[func] = 1 + max([visit(d, path) for d in deps] or [-1])
+        path.discard(func)
+        order.append(func)
+        return depth[func]
+
+    for expr in expressions:
+        for func in _expression_funcs(expr):
+            visit(func, set())
+
+    levels = [[] for _ in range(max(depth.values()) + 1)] if depth else []
+    for func in order:
+        levels[depth[func]].append(func)
+    return levels
+
+
+def _running_loop():
+    """
+    The event loop running in this thread, or None.
+
+    """
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    except AttributeError:  # Python < 3.7
+        return asyncio._get_running_loop()
+
+
+def _asyncio_run(coro):
+    """
+    Run a coroutine in a new event loop, like ``asyncio.run``.
+
+    """
+    if hasattr(asyncio, 'run'):
+        return asyncio.run(coro)
+
+    # Python < 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def _run_coroutine(coro):
+    """
+    Run a coroutine to completion from synchronous code. If an event
+    loop is already running in this thread the coroutine is run
+    in a separate thread with its own loop.
+
+    """
+    if _running_loop() is None:
+        return _asyncio_run(coro)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(_asyncio_run, coro).result()
+
+
+def _is_cached_wrapper(wrapper):
+    if not (_CACHING and wrapper.cache):
+        return False
+    elif isinstance(wrapper, TableFuncWrapper):
+        return _is_cached(_TABLE_CACHE, wrapper.name, wrapper._argspec)
+    elif isinstance(wrapper, _ColumnFuncWrapper):
+        return _is_cached(
+            _COLUMN_CACHE, (wrapper.table_name, wrapper.name),
+            wrapper._argspec)
+    return _is_cached(_INJECTABLE_CACHE, wrapper.name, wrapper._argspec)
 
 
-class _ColumnFuncWrapper(object):
+async def _gather_async(levels, prefetched):
     """
-    Wrap a function that returns a Series.
+    Await coroutine functions level by level, running those in the same
+    level concurrently. Results are stored in `prefetched` and used
+    by `_evaluate_func` in place of calling the functions again.
 
     Parameters
     ----------
-    table_name : str
-        Table with which the column will be associated.
-    column_name : str
-        Name for the column.
-    func : callable
-        Should return a Series that has an
-        index matching the table to which it is being added.
-    cache : bool, optional
-        Whether to cache the result of calling the wrapped function.
-    cache_scope : {'step', 'iteration', 'forever'}, optional
-        Scope for which to cache data. Default is to cache forever
-        (or until manually cleared). 'iteration' caches data for each
-        complete iteration of the pipeline, 'step' caches data for
-        a single step of the pipeline.
-
-    Attributes
-    ----------
-    name : str
-        Column name.
-    table_name : str
-        Name of table this column is associated with.
-    cache : bool
-        Whether caching is enabled for this column.
+    levels : list of lists
+        Wrappers of coroutine functions grouped as by `_func_levels`.
+    prefetched : dict
+        Maps wrappers to results.
 
     """
-    def __init__(
-            self, table_name, column_name, func, cache=False,
-            cache_scope=_CS_FOREVER):
-        self.table_name = table_name
-        self.name = column_name
-        self._func = func
-        self._argspec = getargspec(func)
-        self.cache = cache
-        self.cache_scope = cache_scope
+    _ASYNC_LOCAL.prefetched = prefetched
+    try:
+        for level in levels:
+            level = [w for w in level if not _is_cached_wrapper(w)]
+            coros = [
+                w._func(**_collect_variables(
+                    names=w._argspec.args, expressions=w._argspec.defaults))
+                for w in level]
+            if coros:
+                logger.debug(
+                    'awaiting {} functions concurrently'.format(len(coros)))
+            results = await asyncio.gather(*coros)
+            prefetched.update(zip(level, results))
+    finally:
+        _ASYNC_LOCAL.prefetched = None
+
+
+def precompute(expressions, workers=None):
+    """
+    Fill the cache for a number of variables ahead of time.
+
+    Each cached table, column, and injectable function needed to
+    evaluate `expressions` is evaluated once, after all of its
+    dependencies. Functions that do not depend on each other are
+    evaluated concurrently in a thread pool. Functions without caching
+    enabled are not evaluated directly, but their cached dependencies are.
 
-    def __call__(self):
-        """
-        Evaluate the wrapped function and return the result.
+    Parameters
+    ----------
+    expressions : sequence of str
+        Names of tables and injectables and/or column expressions
+        like 'table.column'.
+    workers : int, optional
+        Maximum number of threads. Defaults to the
+        ``concurrent.futures.ThreadPoolExecutor`` default.
 
-        """
-        if (_CACHING and
-                self.cache and
-                (self.table_name, self.name) in _COLUMN_CACHE):
-            logger.debug(
-                'returning column {!r} for table {!r} from cache'.format(
-                    self.name, self.table_name))
-            return _COLUMN_CACHE[(self.table_name, self.name)].value
+    """
+    for expr in expressions:
+        name = expr.split('.')[0]
+        if not (is_table(name) or is_injectable(name)):
+            raise KeyError('variable not found: {!r}'.format(name))
 
-        with log_start_finish(
-                ('call function to provide column {!r} for table {!r}'
-                 ).format(self.name, self.table_name), logger):
-            kwargs = _collect_variables(names=self._argspec.args,
-                                        expressions=self._argspec.defaults)
-            col = self._func(**kwargs)
+    if not _CACHING:
+        logger.debug('caching is disabled, nothing to precompute')
+        return
 
-        if self.cache:
-            _COLUMN_CACHE[(self.table_name, self.name)] = CacheItem(
-                (self.table_name, self.name), col, self.cache_scope)
+    levels = [[func for func in level if func.cache]
+              for level in _func_levels(expressions)]
 
-        return col
+    with log_start_finish(
+            'precompute {} cached functions'.format(
+                sum(len(level) for level in levels)),
+            logger):
+        if workers == 1:
+            for func in tz.concat(levels):
+                func()
+            return
 
-    def clear_cached(self):
-        """
-        Remove any cached result of this column.
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for level in levels:
+                # raise the first exception, if any, before the next level
+                for future in [pool.submit(func) for func in level]:
+                    future.result()
 
-        """
-        x = _COLUMN_CACHE.pop((self.table_name, self.name), None)
-        if x is not None:
-            logger.debug(
-                'cleared cached value for column {!r} in table {!r}'.format(
-                    self.name, self.table_name))
 
-    def func_source_data(self):
-        """
-        Return data about the wrapped function source, including file name,
-        line number, and source code.
+def set_column_workers(workers=1):
+    """
+    Set the default number of threads `to_frame` uses to compute
+    registered columns that do not depend on each other.
 
-        Returns
-        -------
-        filename : str
-        lineno : int
-            The line number on which the function starts.
-        source : str
+    Parameters
+    ----------
+    workers : int, optional
+        1 (the default) computes columns one at a time.
 
-        """
-        return utils.func_source_data(self._func)
+    """
+    global _COLUMN_WORKERS
+    _COLUMN_WORKERS = workers
 
 
-class _SeriesWrapper(object):
+def _compute_columns(table_name, columns, workers=None):
     """
-    Wrap a Series for the purpose of giving it the same interface as a
-    `_ColumnFuncWrapper`.
+    Evaluate registered columns of a table, running columns that do not
+    depend on each other concurrently.
 
     Parameters
     ----------
     table_name : str
-        Table with which the column will be associated.
-    column_name : str
-        Name for the column.
-    series : pandas.Series
-        Series with index matching the table to which it is being added.
+    columns : dict
+        Column wrappers keyed by column name.
+    workers : int, optional
+        Number of threads. Defaults to the value set with
+        `set_column_workers`.
 
-    Attributes
-    ----------
-    name : str
-        Column name.
-    table_name : str
-        Name of table this column is associated with.
+    Returns
+    -------
+    computed : dict
+        Evaluated columns keyed by column name.
 
     """
-    def __init__(self, table_name, column_name, series):
-        self.table_name = table_name
-        self.name = column_name
-        self._column = series
+    workers = _COLUMN_WORKERS if workers is None else workers
 
-    def __call__(self):
-        return self._column
+    def compute(name):
+        with log_start_finish(
+                'computing column {!r} for table {!r}'.format(
+                    name, table_name),
+                logger):
+            return columns[name]()
 
-    def clear_cached(self):
-        """
-        Here for compatibility with `_ColumnFuncWrapper`.
+    if workers == 1 or len(columns) < 2:
+        return {name: compute(name) for name in columns}
 
-        """
-        pass
+    # group columns so each only depends on columns in earlier groups
+    levels = _func_levels(
+        '{}.{}'.format(table_name, name) for name in columns)
+    groups = [
+        [f.name for f in level
+         if isinstance(f, _ColumnFuncWrapper) and
+         f.table_name == table_name and columns.get(f.name) is f]
+        for level in levels]
+    scheduled = set(tz.concat(groups))
+    groups.insert(0, [name for name in columns if name not in scheduled])
 
+    computed = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for group in groups:
+            futures = [(name, pool.submit(compute, name)) for name in group]
+            for name, future in futures:
+                computed[name] = future.result()
+    return computed
 
-class _InjectableFuncWrapper(object):
+
+def set_process_pool(workers=None, start_method=None):
     """
-    Wraps a function that will provide an injectable value elsewhere.
+    Configure the pool of worker processes used for columns registered
+    with ``executor='process'``. Shuts down any existing pool, a new one
+    is started when it is next needed.
 
     Parameters
     ----------
-    name : str
-    func : callable
-    cache : bool, optional
-        Whether to cache the result of calling the wrapped function.
-    cache_scope : {'step', 'iteration', 'forever'}, optional
-        Scope for which to cache data. Default is to cache forever
-        (or until manually cleared). 'iteration' caches data for each
-        complete iteration of the pipeline, 'step' caches data for
-        a single step of the pipeline.
+    workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+    start_method : {'fork', 'spawn', 'forkserver'}, optional
+        How worker processes are started. Defaults to the
+        multiprocessing default for the platform.
+
+    """
+    global _PROCESS_POOL
+
+    if _PROCESS_POOL is not None:
+        _PROCESS_POOL.shutdown()
+        _PROCESS_POOL = None
+
+    _PROCESS_POOL_OPTIONS['workers'] = workers
+    _PROCESS_POOL_OPTIONS['start_method'] = start_method
+
+
+def _get_process_pool():
+    global _PROCESS_POOL
+
+    if _PROCESS_POOL is None:
+        context = multiprocessing.get_context(
+            _PROCESS_POOL_OPTIONS['start_method'])
+        # workers share the parent's tracker for shared memory blocks
+        resource_tracker.ensure_running()
+        _PROCESS_POOL = ProcessPoolExecutor(
+            max_workers=_PROCESS_POOL_OPTIONS['workers'], mp_context=context)
+    return _PROCESS_POOL
 
-    Attributes
-    ----------
-    name : str
-        Name of this injectable.
-    cache : bool
-        Whether caching is enabled for this injectable function.
 
+def _dumps_shared(obj):
     """
-    def __init__(self, name, func, cache=False, cache_scope=_CS_FOREVER):
-        self.name = name
-        self._func = func
-        self._argspec = getargspec(func)
-        self.cache = cache
-        self.cache_scope = cache_scope
+    Pickle an object with protocol 5, moving large contiguous buffers
+    (such as array data) out-of-band into shared memory blocks.
 
-    def __call__(self):
-        if _CACHING and self.cache and self.name in _INJECTABLE_CACHE:
-            logger.debug(
-                'returning injectable {!r} from cache'.format(self.name))
-            return _INJECTABLE_CACHE[self.name].value
+    Returns
+    -------
+    data : bytes
+        Pickled object without the out-of-band buffers.
+    blocks : list of SharedMemory
+        One block per out-of-band buffer. The caller is responsible
+        for unlinking them.
+    sizes : list of int
+        Size of each buffer, blocks may be larger.
 
-        with log_start_finish(
-                'call function to provide injectable {!r}'.format(self.name),
-                logger):
-            kwargs = _collect_variables(names=self._argspec.args,
-                                        expressions=self._argspec.defaults)
-            result = self._func(**kwargs)
+    """
+    raws = []
 
-        if self.cache:
-            _INJECTABLE_CACHE[self.name] = CacheItem(
-                self.name, result, self.cache_scope)
+    def buffer_callback(buf):
+        try:
+            raws.append(buf.raw())
+        except BufferError:
+            # non-contiguous buffers are pickled in-band
+            return True
+        return False
 
-        return result
+    data = pickle.dumps(obj, protocol=5, buffer_callback=buffer_callback)
 
-    def clear_cached(self):
-        """
-        Clear a cached result for this injectable.
+    blocks = []
+    try:
+        for raw in raws:
+            block = shared_memory.SharedMemory(
+                create=True, size=max(raw.nbytes, 1))
+            blocks.append(block)
+            block.buf[:raw.nbytes] = raw.cast('B')
+    except Exception:
+        _release_blocks(blocks, unlink=True)
+        raise
+    return data, blocks, [raw.nbytes for raw in raws]
 
-        """
-        x = _INJECTABLE_CACHE.pop(self.name, None)
-        if x:
-            logger.debug(
-                'injectable {!r} removed from cache'.format(self.name))
 
+def _block_specs(blocks, sizes):
+    return [(b.name, n) for b, n in zip(blocks, sizes)]
 
-class _StepFuncWrapper(object):
+
+def _loads_shared(data, specs, copy):
     """
-    Wrap a step function for argument matching.
+    Unpickle an object written by `_dumps_shared`.
 
     Parameters
     ----------
-    step_name : str
-    func : callable
+    data : bytes
+    specs : list of (str, int)
+        Shared memory block names and buffer sizes.
+    copy : bool
+        Whether to copy buffers out of shared memory. If False the
+        returned object references the shared memory blocks, which
+        are returned so they can be closed once it is no longer used.
 
-    Attributes
-    ----------
-    name : str
-        Name of step.
+    Returns
+    -------
+    obj : object
+    blocks : list of SharedMemory
 
     """
-    def __init__(self, step_name, func):
-        self.name = step_name
-        self._func = func
-        self._argspec = getargspec(func)
-
-    def __call__(self):
-        with log_start_finish('calling step {!r}'.format(self.name), logger):
-            kwargs = _collect_variables(names=self._argspec.args,
-                                        expressions=self._argspec.defaults)
-            return self._func(**kwargs)
+    blocks = [shared_memory.SharedMemory(name=name) for name, _ in specs]
+    buffers = [b.buf[:n] for b, (_, n) in zip(blocks, specs)]
+    if copy:
+        buffers = [bytearray(buf) for buf in buffers]
+    return pickle.loads(data, buffers=buffers), blocks
 
-    def _tables_used(self):
-        """
-        Tables injected into the step.
 
-        Returns
-        -------
-        tables : set of str
+def _release_blocks(blocks, unlink):
+    for block in blocks:
+        try:
+            block.close()
+        except BufferError:
+            # still referenced, the mapping is released when collected
+            pass
+        if unlink:
+            block.unlink()
 
-        """
-        args = list(self._argspec.args)
-        if self._argspec.defaults:
-            default_args = list(self._argspec.defaults)
-        else:
-            default_args = []
-        # Combine names from argument names and argument default values.
-        names = args[:len(args) - len(default_args)] + default_args
-        tables = set()
-        for name in names:
-            parent_name = name.split('.')[0]
-            if is_table(parent_name):
-                tables.add(parent_name)
-        return tables
 
-    def func_source_data(self):
-        """
-        Return data about a step function's source, including file name,
-        line number, and source code.
+def _call_in_process(func, data, specs):
+    """
+    Worker process side of `_run_in_process`. Reads the function's
+    arguments from shared memory without copying and writes the result
+    to new shared memory blocks.
 
-        Returns
-        -------
-        filename : str
-        lineno : int
-            The line number on which the function starts.
-        source : str
+    """
+    kwargs, in_blocks = _loads_shared(data, specs, copy=False)
+    try:
+        result = func(**kwargs)
+        out_data, out_blocks, out_sizes = _dumps_shared(result)
+        del kwargs, result
+    finally:
+        gc.collect()
+        _release_blocks(in_blocks, unlink=False)
 
-        """
-        return utils.func_source_data(self._func)
+    out_specs = _block_specs(out_blocks, out_sizes)
+    _release_blocks(out_blocks, unlink=False)
+    return out_data, out_specs
 
 
-def is_table(name):
+def _evaluate_func(wrapper, kwargs):
     """
-    Returns whether a given name refers to a registered table.
+    Call a wrapper's function with collected arguments, in a worker
+    process for columns registered with ``executor='process'``.
+    Coroutine functions are run to completion, unless their result
+    was already gathered by `_gather_async`. While `eval_variables`
+    runs each function is evaluated only once.
 
     """
-    return name in _TABLES
+    prefetched = getattr(_ASYNC_LOCAL, 'prefetched', None)
+    if prefetched and wrapper in prefetched:
+        return prefetched[wrapper]
 
+    memo = _EVAL_MEMO
+    if memo is None or isinstance(wrapper, _StepFuncWrapper):
+        return _call_wrapped(wrapper, kwargs)
+    if wrapper not in memo:
+        memo[wrapper] = _call_wrapped(wrapper, kwargs)
+    return memo[wrapper]
 
-def list_tables():
+
+def _call_wrapped(wrapper, kwargs):
+    if not isinstance(wrapper, _ColumnFuncWrapper) or \
+            wrapper.executor != 'process':
+        result = wrapper._func(**kwargs)
+        if inspect.isawaitable(result):
+            result = _run_coroutine(result)
+        return result
+
+    for arg, value in kwargs.items():
+        if isinstance(value, (DataFrameWrapper, TableFuncWrapper)):
+            raise OrcaError(
+                'column {!r} on table {!r} runs in a process and cannot '
+                'take table {!r} as an argument, use column '
+                'expressions instead'.format(
+                    wrapper.name, wrapper.table_name, arg))
+
+    logger.debug(
+        'evaluating column {!r} on table {!r} in a worker process'.format(
+            wrapper.name, wrapper.table_name))
+    return _run_in_process(wrapper._func, kwargs)
+
+
+def _run_in_process(func, kwargs):
     """
-    List of table names.
+    Call a function in the process pool, passing array data through
+    shared memory rather than copying it over a pipe.
 
     """
-    return list(_TABLES.keys())
+    if shared_memory is None or sys.platform == 'win32':
+        # on Windows shared memory blocks are freed once no process has
+        # them open, so results could not be handed back to the parent
+        raise OrcaError(
+            'process executor requires Python 3.8 or later '
+            'on Linux or macOS')
 
+    data, blocks, sizes = _dumps_shared(kwargs)
+    out_specs = []
+    try:
+        out_data, out_specs = _get_process_pool().submit(
+            _call_in_process, func, data, _block_specs(blocks, sizes)
+        ).result()
+        result, out_blocks = _loads_shared(out_data, out_specs, copy=True)
+        _release_blocks(out_blocks, unlink=True)
+        return result
+    finally:
+        _release_blocks(blocks, unlink=True)
 
-def list_columns():
+
+def _reader_inputs(expression):
     """
-    List of (table name, registered column name) pairs.
+    Dependency graph nodes read when a variable expression is injected.
+
+    Nodes are tuples like ``('table', name)``, ``('column', table, name)``,
+    or ``('injectable', name)``. A bare name may be registered as a table
+    or an injectable later on, so it is recorded as both. Whole-table
+    readers are found through the ``('table', name)`` node, which
+    changes whenever any of the table's columns change.
+
+    Parameters
+    ----------
+    expression : str
+
+    Returns
+    -------
+    nodes : set of tuple
 
     """
-    return list(_COLUMNS.keys())
+    if '.' in expression:
+        table_name, column_name = expression.split('.')
+        return {('column', table_name, column_name)}
+    return {('table', expression), ('injectable', expression)}
 
 
-def list_steps():
+def _index_reads(node, value):
     """
-    List of registered step names.
+    Record the inputs of a newly registered table, column, or injectable
+    in the reverse dependency index used by `_invalidate_nodes`,
+    replacing those of any value previously registered under the same
+    node. Also keeps track of registered coroutine functions.
+
+    Parameters
+    ----------
+    node : tuple
+        ``('table', name)``, ``('column', table, name)``,
+        or ``('injectable', name)``.
+    value : object
+        The registered value. Only wrapped functions read other values.
 
     """
-    return list(_STEPS.keys())
+    _ASYNC_NODES.discard(node)
+    for input_node in _READS.pop(node, ()):
+        readers = _READERS.get(input_node)
+        if readers is not None:
+            readers.discard(node)
+            if not readers:
+                del _READERS[input_node]
 
+    if not isinstance(
+            value,
+            (TableFuncWrapper, _ColumnFuncWrapper, _InjectableFuncWrapper)):
+        return
 
-def list_injectables():
+    if inspect.iscoroutinefunction(value._func):
+        _ASYNC_NODES.add(node)
+
+    inputs = set()
+    for expr in _argspec_expressions(value._argspec):
+        inputs.update(_reader_inputs(expr))
+    _READS[node] = inputs
+    for input_node in inputs:
+        _READERS.setdefault(input_node, set()).add(node)
+
+
+def _registered(node):
     """
-    List of registered injectables.
+    The value currently registered for a dependency graph node.
 
     """
-    return list(_INJECTABLES.keys())
+    if node[0] == 'table':
+        return _TABLES.get(node[1])
+    elif node[0] == 'column':
+        return _COLUMNS.get(node[1:])
+    else:
+        return _INJECTABLES.get(node[1])
 
 
-def list_broadcasts():
+def _wrapper_outputs(wrapper):
     """
-    List of registered broadcasts as (cast table name, onto table name).
+    Dependency graph nodes whose value changes when the given wrapper's
+    value changes.
+
+    Parameters
+    ----------
+    wrapper : TableFuncWrapper, _ColumnFuncWrapper, or _InjectableFuncWrapper
+
+    Returns
+    -------
+    nodes : set of tuple
 
     """
-    return list(_BROADCASTS.keys())
+    if isinstance(wrapper, TableFuncWrapper):
+        nodes = {('table', wrapper.name)}
+        nodes.update(('column', wrapper.name, c) for c in wrapper._columns)
+        return nodes
+    elif isinstance(wrapper, _ColumnFuncWrapper):
+        return {('table', wrapper.table_name),
+                ('column', wrapper.table_name, wrapper.name)}
+    else:
+        return {('injectable', wrapper.name)}
 
 
-def is_expression(name):
+def _invalidate_dependents(table_name, column_name):
     """
-    Checks whether a given name is a simple variable name or a compound
-    variable expression.
+    Evict cached results that depend, directly or transitively, on a
+    column of a table whose data has been updated.
+
+    Dependencies are taken from the argument names and default value
+    expressions of registered table, column, and injectable functions.
+    A function that is injected a whole table is assumed to read all
+    of that table's columns.
 
     Parameters
     ----------
-    name : str
-
-    Returns
-    -------
-    is_expr : bool
+    table_name : str
+        Name of the updated table.
+    column_name : str
+        Name of the updated column.
 
     """
-    return '.' in name
+    _invalidate_nodes(
+        [('table', table_name), ('column', table_name, column_name)])
+    logger.debug(
+        'cleared cached values depending on column {!r} of table {!r}'.format(
+            column_name, table_name))
 
 
-def _collect_variables(names, expressions=None):
+def _invalidate_nodes(changed):
     """
-    Map labels and expressions to registered variables.
+    Evict cached results that depend, directly or transitively, on
+    some dependency graph nodes (see `_reader_inputs`). Readers are
+    looked up in the index kept up to date by `_index_reads`.
 
-    Handles argument matching.
-
-    Example:
+    Parameters
+    ----------
+    changed : list of tuple
+        Nodes whose values have changed.
+
+    """
+    if not (_TABLE_CACHE or _COLUMN_CACHE or _INJECTABLE_CACHE):
+        return
+
+    changed = list(changed)
+    seen = set(changed)
+    visited = set()
+    while changed:
+        node = changed.pop()
+        for reader in list(_READERS.get(node, ())):
+            func = _registered(reader)
+            if func is None or func in visited:
+                continue
+            visited.add(func)
+            if isinstance(func, TableFuncWrapper):
+                # only this table's result, its columns are handled
+                # through their own dependencies. Tables that steps have
+                # updated in place are kept so the updates are not lost.
+                with _CACHE_LOCK:
+                    item = _TABLE_CACHE.get(func.name)
+                    if (item is not None and
+                            item.value.version != item.value._base_version):
+                        logger.debug(
+                            'keeping updated table {!r} in cache'.format(
+                                func.name))
+                        continue
+                    if _pop_cached(_TABLE_CACHE, func.name) is not None:
+                        logger.debug(
+                            'table {!r} removed from cache'.format(
+                                func.name))
+            else:
+                func.clear_cached()
+            for out in _wrapper_outputs(func) - seen:
+                seen.add(out)
+                changed.append(out)
 
-        _collect_variables(names=['zones', 'zone_id'],
-                           expressions=['parcels.zone_id'])
 
-    Would return a dict representing:
+def compact_frame(
+        df, floats=False, category_ratio=0.5, allow_lossy=(), small_ints=()):
+    """
+    Store a DataFrame's columns with smaller data types where that
+    does not change any values.
 
-        {'parcels': <DataFrameWrapper for zones>,
-         'zone_id': <pandas.Series for parcels.zone_id>}
+    64 bit integer columns are converted to 32 bits if that holds their
+    range. Columns in `small_ints` are downcast further, to the smallest
+    type that holds their range; arithmetic on such columns overflows
+    easily, so only choose columns that are not computed with.
+    Float64 columns are converted to float32 if `floats` is True,
+    but only if all values survive the conversion unless the column is
+    in `allow_lossy`. String columns with few distinct values become
+    categoricals.
 
     Parameters
     ----------
-    names : list of str
-        List of registered variable names and/or labels.
-        If mixing names and labels, labels must come at the end.
-    expressions : list of str, optional
-        List of registered variable expressions for labels defined
-        at end of `names`. Length must match the number of labels.
+    df : pandas.DataFrame
+    floats : bool, optional
+        Whether to convert float64 columns to float32.
+    category_ratio : float, optional
+        String columns whose number of distinct values is at most this
+        fraction of their length are converted to categoricals.
+        Use 0 to never convert.
+    allow_lossy : sequence of str, optional
+        Columns that may be converted to float32 even if some values
+        change in the process.
+    small_ints : sequence of str, optional
+        Integer columns that may be downcast below 32 bits.
 
     Returns
     -------
-    variables : dict
-        Keys match `names`. Values correspond to registered variables,
-        which may be wrappers or evaluated functions if appropriate.
+    compacted : pandas.DataFrame
+        A new DataFrame, `df` is not modified.
+
+    """
+    allow_lossy = set(allow_lossy)
+    small_ints = set(small_ints)
+    compacted = {}
+
+    for i, (name, col) in enumerate(df.items()):
+        dtype = col.dtype
+        if pd.api.types.is_bool_dtype(dtype):
+            pass
+        elif pd.api.types.is_integer_dtype(dtype) and name in small_ints:
+            col = pd.to_numeric(
+                col, downcast='unsigned'
+                if pd.api.types.is_unsigned_integer_dtype(dtype)
+                else 'integer')
+        elif pd.api.types.is_integer_dtype(dtype):
+            if isinstance(dtype, np.dtype) and dtype.itemsize > 4:
+                small = np.dtype(dtype.kind + '4')
+                if _fits_int_dtype(col, small):
+                    col = col.astype(small)
+        elif floats and dtype == np.float64:
+            small = col.astype(np.float32)
+            if name in allow_lossy or np.array_equal(
+                    small.to_numpy(np.float64), col.to_numpy(),
+                    equal_nan=True):
+                col = small
+            else:
+                logger.debug(
+                    'keeping float64 for column {!r}, float32 would '
+                    'change values'.format(name))
+        elif (dtype == object or isinstance(dtype, pd.StringDtype)) and \
+                len(col) and category_ratio > 0 and \
+                pd.api.types.infer_dtype(col, skipna=True) == 'string' and \
+                col.nunique() <= category_ratio * len(col):
+            col = col.astype('category')
+        compacted[i] = col
+
+    # keyed by position in case of duplicate column names
+    result = pd.DataFrame(compacted, index=df.index)
+    result.columns = df.columns
+
+    before = int(df.memory_usage(deep=True).sum())
+    after = int(result.memory_usage(deep=True).sum())
+    logger.info('compacted table data from {} to {} bytes, saving {}'.format(
+        before, after, before - after))
+    return result
 
+
+def _fits_int_dtype(values, dtype):
     """
-    # Map registered variable labels to expressions.
-    if not expressions:
-        expressions = []
-    offset = len(names) - len(expressions)
-    labels_map = dict(tz.concatv(
-        zip(names[:offset], names[:offset]),
-        zip(names[offset:], expressions)))
+    Whether all numeric `values` lie in the range of integer `dtype`.
 
-    all_variables = tz.merge(_INJECTABLES, _TABLES)
-    variables = {}
-    for label, expression in labels_map.items():
-        # In the future, more registered variable expressions could be
-        # supported. Currently supports names of registered variables
-        # and references to table columns.
-        if '.' in expression:
-            # Registered variable expression refers to column.
-            table_name, column_name = expression.split('.')
-            table = get_table(table_name)
-            variables[label] = table.get_column(column_name)
-        else:
-            thing = all_variables[expression]
-            if isinstance(thing, (_InjectableFuncWrapper, TableFuncWrapper)):
-                # Registered variable object is function.
-                variables[label] = thing()
-            else:
-                variables[label] = thing
+    """
+    if not len(values):
+        return True
+    info = np.iinfo(dtype)
+    return bool(values.min() >= info.min and values.max() <= info.max)
 
-    return variables
+
+def _compact_options(compact):
+    if compact is True:
+        return {}
+    elif compact:
+        return dict(compact)
+    return None
 
 
 def add_table(
         table_name, table, cache=False, cache_scope=_CS_FOREVER,
-        copy_col=True):
+        copy_col=True, storage='frame', compact=False):
     """
     Register a table with Orca.
 
@@ -1156,13 +3472,24 @@ def add_table(
     cache : bool, optional
         Whether to cache the results of a provided callable. Does not
         apply if `table` is a DataFrame.
-    cache_scope : {'step', 'iteration', 'forever'}, optional
+    cache_scope : {'step', 'iteration', 'forever', 'auto'}, optional
         Scope for which to cache data. Default is to cache forever
         (or until manually cleared). 'iteration' caches data for each
         complete iteration of the pipeline, 'step' caches data for
-        a single step of the pipeline.
-    copy_col : bool, optional
-        Whether to return copies when evaluating columns.
+        a single step of the pipeline, 'auto' caches data until
+        one of the function's inputs changes.
+    copy_col : bool or 'cow', optional
+        Whether to return copies when evaluating columns. 'cow'
+        returns read-only views that are only copied when written to,
+        see `DataFrameWrapper.get_column`.
+    storage : {'frame', 'columns'}, optional
+        How the table's data is stored. 'columns' keeps an array per
+        column so that adding and replacing columns is cheap,
+        see `DataFrameWrapper`.
+    compact : bool or dict, optional
+        Whether to store the table's data with smaller data types,
+        see `compact_frame`. A dict is passed to `compact_frame` as
+        keyword arguments. Table functions have their results compacted.
 
     Returns
     -------
@@ -1171,21 +3498,29 @@ def add_table(
     """
     if isinstance(table, Callable):
         table = TableFuncWrapper(table_name, table, cache=cache,
-                                 cache_scope=cache_scope, copy_col=copy_col)
+                                 cache_scope=cache_scope, copy_col=copy_col,
+                                 storage=storage, compact=compact)
     else:
-        table = DataFrameWrapper(table_name, table, copy_col=copy_col)
+        options = _compact_options(compact)
+        if options is not None:
+            table = compact_frame(table, **options)
+        table = DataFrameWrapper(
+            table_name, table, copy_col=copy_col, storage=storage)
 
     # clear any cached data from a previously registered table
     table.clear_cached()
 
     logger.debug('registering table {!r}'.format(table_name))
     _TABLES[table_name] = table
+    _clear_plans(table_name)
+    _index_reads(('table', table_name), table)
 
     return table
 
 
 def table(
-        table_name=None, cache=False, cache_scope=_CS_FOREVER, copy_col=True):
+        table_name=None, cache=False, cache_scope=_CS_FOREVER, copy_col=True,
+        storage='frame', compact=False):
     """
     Decorates functions that return DataFrames.
 
@@ -1206,7 +3541,7 @@ def table(
             name = func.__name__
         add_table(
             name, func, cache=cache, cache_scope=cache_scope,
-            copy_col=copy_col)
+            copy_col=copy_col, storage=storage, compact=compact)
         return func
     return decorator
 
@@ -1275,7 +3610,8 @@ def table_type(table_name):
 
 
 def add_column(
-        table_name, column_name, column, cache=False, cache_scope=_CS_FOREVER):
+        table_name, column_name, column, cache=False, cache_scope=_CS_FOREVER,
+        executor=None):
     """
     Add a new column to a table from a Series or callable.
 
@@ -1294,18 +3630,26 @@ def add_column(
     cache : bool, optional
         Whether to cache the results of a provided callable. Does not
         apply if `column` is a Series.
-    cache_scope : {'step', 'iteration', 'forever'}, optional
+    cache_scope : {'step', 'iteration', 'forever', 'auto'}, optional
         Scope for which to cache data. Default is to cache forever
         (or until manually cleared). 'iteration' caches data for each
         complete iteration of the pipeline, 'step' caches data for
-        a single step of the pipeline.
+        a single step of the pipeline, 'auto' caches data until
+        one of the function's inputs changes.
+    executor : {None, 'process'}, optional
+        Where to evaluate the callable. 'process' runs it in a pool of
+        worker processes (see `set_process_pool`), useful for
+        Python-heavy functions that hold the GIL. The function must be
+        picklable and may only take columns and injectables as
+        arguments, array data is passed through shared memory.
+        Requires Python 3.8 or later and is not available on Windows.
 
     """
     if isinstance(column, Callable):
         column = \
             _ColumnFuncWrapper(
                 table_name, column_name, column,
-                cache=cache, cache_scope=cache_scope)
+                cache=cache, cache_scope=cache_scope, executor=executor)
     else:
         column = _SeriesWrapper(table_name, column_name, column)
 
@@ -1315,11 +3659,15 @@ def add_column(
     logger.debug('registering column {!r} on table {!r}'.format(
         column_name, table_name))
     _COLUMNS[(table_name, column_name)] = column
+    _COLUMNS_BY_TABLE.setdefault(table_name, {})[column_name] = column
+    _index_reads(('column', table_name, column_name), column)
 
     return column
 
 
-def column(table_name, column_name=None, cache=False, cache_scope=_CS_FOREVER):
+def column(
+        table_name, column_name=None, cache=False, cache_scope=_CS_FOREVER,
+        executor=None):
     """
     Decorates functions that return a Series.
 
@@ -1340,7 +3688,8 @@ def column(table_name, column_name=None, cache=False, cache_scope=_CS_FOREVER):
         else:
             name = func.__name__
         add_column(
-            table_name, name, func, cache=cache, cache_scope=cache_scope)
+            table_name, name, func, cache=cache, cache_scope=cache_scope,
+            executor=executor)
         return func
     return decorator
 
@@ -1358,7 +3707,7 @@ def list_columns_for_table(table_name):
     columns : list of str
 
     """
-    return [cname for tname, cname in _COLUMNS.keys() if tname == table_name]
+    return list(_COLUMNS_BY_TABLE.get(table_name, {}).keys())
 
 
 def _columns_for_table(table_name):
@@ -1375,9 +3724,7 @@ def _columns_for_table(table_name):
         Keys will be column names.
 
     """
-    return {cname: col
-            for (tname, cname), col in _COLUMNS.items()
-            if tname == table_name}
+    return dict(_COLUMNS_BY_TABLE.get(table_name, {}))
 
 
 def column_map(tables, columns):
@@ -1436,7 +3783,8 @@ def get_raw_column(table_name, column_name):
             column_name, table_name))
 
 
-def _memoize_function(f, name, cache_scope=_CS_FOREVER):
+def _memoize_function(
+        f, name, cache_scope=_CS_FOREVER, maxsize=None, vectorized=False):
     """
     Wraps a function for memoization and ties it's cache into the
     Orca cacheing system.
@@ -1451,30 +3799,99 @@ def _memoize_function(f, name, cache_scope=_CS_FOREVER):
         (or until manually cleared). 'iteration' caches data for each
         complete iteration of the pipeline, 'step' caches data for
         a single step of the pipeline.
+    maxsize : int, optional
+        Maximum number of results to keep. When the cache is full the
+        least recently used result is discarded. By default the cache
+        size is not limited.
+    vectorized : bool, optional
+        Whether `f` accepts an array of values for its single argument
+        and returns an array-like of results with the same length.
+        If True, calling the wrapper with an array, Series, Index, or list
+        looks up each value in the cache and calls `f` once with all
+        of the values that are not yet cached.
+
+    """
+    cache = OrderedDict()
+    stats = {'hits': 0, 'misses': 0}
+    not_cached = object()
+
+    def lookup(cache_key):
+        # move hits to the end so the front of the cache is least
+        # recently used
+        with _CACHE_LOCK:
+            if not _CACHING or cache_key not in cache:
+                return not_cached
+            result = cache.pop(cache_key)
+            cache[cache_key] = result
+            stats['hits'] += 1
+            return result
 
-    """
-    cache = {}
+    def store(cache_key, result):
+        with _CACHE_LOCK:
+            stats['misses'] += 1
+            cache.pop(cache_key, None)
+            cache[cache_key] = result
+            if maxsize is not None:
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+
+    def vectorized_key(value):
+        # NaN != NaN, so all NaNs share one cache entry
+        return ((np.nan if value != value else value,), None)
+
+    def call_vectorized(keys):
+        # results are mapped back to keys by position, unlike a dict
+        # this also works for NaN keys
+        try:
+            codes, values = pd.factorize(
+                np.asarray(keys), use_na_sentinel=False)
+        except TypeError:  # pandas < 1.5
+            codes, values = pd.factorize(np.asarray(keys), na_sentinel=None)
+        values = np.asarray(values)
+        results = [None] * len(values)
+        missing = []
+        for i, value in enumerate(values):
+            result = lookup(vectorized_key(value))
+            if result is not_cached:
+                missing.append(i)
+            else:
+                results[i] = result
+
+        if missing:
+            computed = f(values[missing])
+            for i, result in zip(missing, computed):
+                store(vectorized_key(values[i]), result)
+                results[i] = result
+
+        out = [results[code] for code in codes]
+        if isinstance(keys, pd.Series):
+            return pd.Series(out, index=keys.index, name=keys.name)
+        return np.array(out)
 
     @wraps(f)
     def wrapper(*args, **kwargs):
+        if (vectorized and len(args) == 1 and not kwargs and
+                isinstance(args[0], (np.ndarray, pd.Series, pd.Index, list))):
+            return call_vectorized(args[0])
+
         try:
             cache_key = (
                 args or None, frozenset(kwargs.items()) if kwargs else None)
-            in_cache = cache_key in cache
+            result = lookup(cache_key)
         except TypeError:
             raise TypeError(
                 'function arguments must be hashable for memoization')
 
-        if _CACHING and in_cache:
-            return cache[cache_key]
-        else:
+        if result is not_cached:
             result = f(*args, **kwargs)
-            cache[cache_key] = result
-            return result
+            store(cache_key, result)
+        return result
 
     wrapper.__wrapped__ = f
     wrapper.cache = cache
     wrapper.clear_cached = lambda: cache.clear()
+    wrapper.cache_info = lambda: MemoInfo(
+        stats['hits'], stats['misses'], maxsize, len(cache))
     _MEMOIZED[name] = CacheItem(name, wrapper, cache_scope)
 
     return wrapper
@@ -1482,7 +3899,7 @@ def _memoize_function(f, name, cache_scope=_CS_FOREVER):
 
 def add_injectable(
         name, value, autocall=True, cache=False, cache_scope=_CS_FOREVER,
-        memoize=False):
+        memoize=False, maxsize=None, vectorized=False):
     """
     Add a value that will be injected into other functions.
 
@@ -1503,17 +3920,28 @@ def add_injectable(
     cache : bool, optional
         Whether to cache the return value of an injectable function.
         Only applies when `value` is a callable and `autocall` is True.
-    cache_scope : {'step', 'iteration', 'forever'}, optional
+    cache_scope : {'step', 'iteration', 'forever', 'auto'}, optional
         Scope for which to cache data. Default is to cache forever
         (or until manually cleared). 'iteration' caches data for each
         complete iteration of the pipeline, 'step' caches data for
-        a single step of the pipeline.
+        a single step of the pipeline, 'auto' caches data until
+        one of the function's inputs changes.
     memoize : bool, optional
         If autocall is False it is still possible to cache function results
         by setting this flag to True. Cached values are stored in a dictionary
         keyed by argument values, so the argument values must be hashable.
         Memoized functions have their caches cleared according to the same
         rules as universal caching.
+    maxsize : int, optional
+        Maximum number of results kept by a memoized function, the least
+        recently used results are discarded first. Only applies when
+        `memoize` is True. By default the number of results is not limited.
+    vectorized : bool, optional
+        Only applies when `memoize` is True. Set to True if the function
+        accepts an array of values for its single argument and returns an
+        array-like of results of the same length. Calling the memoized
+        function with an array then evaluates all uncached values in one
+        call while still caching each value's result.
 
     """
     if isinstance(value, Callable):
@@ -1523,15 +3951,20 @@ def add_injectable(
             # clear any cached data from a previously registered value
             value.clear_cached()
         elif not autocall and memoize:
-            value = _memoize_function(value, name, cache_scope=cache_scope)
+            value = _memoize_function(
+                value, name, cache_scope=cache_scope, maxsize=maxsize,
+                vectorized=vectorized)
 
     logger.debug('registering injectable {!r}'.format(name))
     _INJECTABLES[name] = value
+    _INJECTABLE_VERSIONS[name] = next(_VERSIONS)
+    _clear_plans(name)
+    _index_reads(('injectable', name), value)
 
 
 def injectable(
         name=None, autocall=True, cache=False, cache_scope=_CS_FOREVER,
-        memoize=False):
+        memoize=False, maxsize=None, vectorized=False):
     """
     Decorates functions that will be injected into other functions.
 
@@ -1552,7 +3985,7 @@ def injectable(
             n = func.__name__
         add_injectable(
             n, func, autocall=autocall, cache=cache, cache_scope=cache_scope,
-            memoize=memoize)
+            memoize=memoize, maxsize=maxsize, vectorized=vectorized)
         return func
     return decorator
 
@@ -1655,7 +4088,7 @@ def get_injectable_func_source_data(name):
         return utils.func_source_data(inj)
 
 
-def add_step(step_name, func):
+def add_step(step_name, func, writes=None):
     """
     Add a step function to Orca.
 
@@ -1669,16 +4102,21 @@ def add_step(step_name, func):
     ----------
     step_name : str
     func : callable
+    writes : sequence of str, optional
+        Names of the tables and injectables the step modifies, columns
+        may be given as ``'table.column'``. Declaring this allows `run`
+        to run the step concurrently with neighboring steps that
+        neither read nor write the same things.
 
     """
     if isinstance(func, Callable):
         logger.debug('registering step {!r}'.format(step_name))
-        _STEPS[step_name] = _StepFuncWrapper(step_name, func)
+        _STEPS[step_name] = _StepFuncWrapper(step_name, func, writes=writes)
     else:
         raise TypeError('func must be a callable')
 
 
-def step(step_name=None):
+def step(step_name=None, writes=None):
     """
     Decorates functions that will be called by the `run` function.
 
@@ -1697,7 +4135,7 @@ def step(step_name=None):
             name = step_name
         else:
             name = func.__name__
-        add_step(name, func)
+        add_step(name, func, writes=writes)
         return func
     return decorator
 
@@ -1887,6 +4325,54 @@ def _next_merge(merge_node):
             raise OrcaError('No node found for next merge.')
 
 
+def _broadcast_positions(onto_table, cast_table, bc, cast_wrapper):
+    """
+    For a broadcast joining a column of `onto_table` to the index of
+    `cast_table`, the position in `cast_table` of each row's key.
+    Returns None for joins that need ``pd.merge``: joins on other
+    columns or indexes, non-unique or missing-value indexes, keys whose
+    type differs from the index, and tables sharing column names.
+
+    """
+    if not (bc.onto_on and bc.cast_index and
+            not bc.onto_index and not bc.cast_on):
+        return None
+
+    index = cast_table.index
+    if (isinstance(index, pd.MultiIndex) or not index.is_unique or
+            index.hasnans or not onto_table.columns.is_unique or
+            bc.onto_on not in onto_table.columns or
+            not set(onto_table.columns).isdisjoint(cast_table.columns)):
+        return None
+
+    keys = onto_table[bc.onto_on]
+    if keys.dtype != index.dtype:
+        return None
+
+    # the table wrapper keeps its index lookups, a merged frame
+    # has a new index
+    if (isinstance(cast_wrapper, DataFrameWrapper) and
+            index is cast_wrapper.index):
+        return cast_wrapper.positions(keys.values)
+    return index.get_indexer(keys.values)
+
+
+def _merge_by_position(onto_table, cast_table, positions):
+    """
+    Inner join the rows of `cast_table` at `positions` onto
+    `onto_table`, which keeps its index and row order. Rows of
+    `onto_table` with position -1 are dropped.
+
+    """
+    found = positions != -1
+    if not found.all():
+        onto_table = onto_table.iloc[found]
+        positions = positions[found]
+    cast_rows = cast_table.take(positions)
+    cast_rows.index = onto_table.index
+    return pd.concat([onto_table, cast_rows], axis=1)
+
+
 def merge_tables(target, tables, columns=None, drop_intersection=True):
     """
     Merge a number of tables onto a target table. Tables must have
@@ -1958,8 +4444,10 @@ def merge_tables(target, tables, columns=None, drop_intersection=True):
     colmap = column_map(tables.values(), columns)
 
     # get frames
-    frames = {name: t.to_frame(columns=colmap[name])
+    # merging makes new frames, so only the target may need a copy
+    frames = {name: t.to_frame(columns=colmap[name], copy=False)
               for name, t in tables.items()}
+    unmerged = frames[target]
 
     past_intersections = set()
 
@@ -1999,11 +4487,17 @@ def merge_tables(target, tables, columns=None, drop_intersection=True):
                 # number of intersections
                 past_intersections = past_intersections.union(intersection)
 
-                onto_table = pd.merge(
-                    onto_table, cast_table,
-                    suffixes=['_'+onto, '_'+cast],
-                    left_on=bc.onto_on, right_on=bc.cast_on,
-                    left_index=bc.onto_index, right_index=bc.cast_index)
+                positions = _broadcast_positions(
+                    onto_table, cast_table, bc, tables.get(cast))
+                if positions is not None:
+                    onto_table = _merge_by_position(
+                        onto_table, cast_table, positions)
+                else:
+                    onto_table = pd.merge(
+                        onto_table, cast_table,
+                        suffixes=['_'+onto, '_'+cast],
+                        left_on=bc.onto_on, right_on=bc.cast_on,
+                        left_index=bc.onto_index, right_index=bc.cast_index)
 
         # replace the existing table with the merged one
         frames[onto] = onto_table
@@ -2016,6 +4510,8 @@ def merge_tables(target, tables, columns=None, drop_intersection=True):
         _recursive_getitem(merges, onto)[onto] = {}
 
     logger.debug('finished merge')
+    if frames[target] is unmerged:
+        return unmerged.copy()
     return frames[target]
 
 
@@ -2039,6 +4535,245 @@ def get_step_table_names(steps):
     return list(table_names)
 
 
+class DependencyGraph(object):
+    """
+    Directed graph of the dependencies between registered tables,
+    columns, injectables, broadcasts, and steps.
+
+    Nodes are ``(kind, name)`` tuples where kind is one of 'table',
+    'column', 'injectable', 'broadcast', or 'step'. Columns are named
+    like 'table.column' and broadcasts like 'cast->onto'.
+    Edges point from a variable to the things that use it.
+
+    Use `dependency_graph` to build a graph of the current registry.
+
+    Parameters
+    ----------
+    nodes : list of tuple
+    edges : list of (tuple, tuple)
+
+    Attributes
+    ----------
+    nodes : list of tuple
+    edges : list of (tuple, tuple)
+
+    """
+    def __init__(self, nodes, edges):
+        self.nodes = list(nodes)
+        self.edges = list(edges)
+
+    def predecessors(self, node):
+        """
+        Nodes the given node directly depends on.
+
+        """
+        return [a for a, b in self.edges if b == node]
+
+    def successors(self, node):
+        """
+        Nodes that directly depend on the given node.
+
+        """
+        return [b for a, b in self.edges if a == node]
+
+    def _adjacency(self):
+        adj = OrderedDict((n, []) for n in self.nodes)
+        for a, b in self.edges:
+            adj[a].append(b)
+        return adj
+
+    def cycles(self):
+        """
+        Find dependency cycles.
+
+        Returns
+        -------
+        cycles : list of lists
+            Each cycle is a list of nodes where each node depends on the
+            one before it and the first node depends on the last.
+            Empty if the graph is acyclic.
+
+        """
+        adj = self._adjacency()
+        state = {}
+        cycles = []
+
+        for start in adj:
+            if start in state:
+                continue
+            # iterative depth-first search keeping the current path
+            path = [start]
+            state[start] = 'active'
+            stack = [iter(adj[start])]
+            while stack:
+                for node in stack[-1]:
+                    if state.get(node) == 'active':
+                        cycles.append(path[path.index(node):])
+                    elif node not in state:
+                        state[node] = 'active'
+                        path.append(node)
+                        stack.append(iter(adj[node]))
+                        break
+                else:
+                    state[path.pop()] = 'done'
+                    stack.pop()
+
+        return cycles
+
+    def topological_order(self):
+        """
+        Order nodes so that every node comes after all of its dependencies.
+
+        Returns
+        -------
+        order : list of tuple
+
+        Raises
+        ------
+        OrcaError
+            If the graph has cycles.
+
+        """
+        adj = self._adjacency()
+        indegree = OrderedDict((n, 0) for n in adj)
+        for a, b in self.edges:
+            indegree[b] += 1
+
+        ready = [n for n, d in indegree.items() if d == 0]
+        order = []
+        while ready:
+            node = ready.pop(0)
+            order.append(node)
+            for succ in adj[node]:
+                indegree[succ] -= 1
+                if indegree[succ] == 0:
+                    ready.append(succ)
+
+        if len(order) != len(adj):
+            raise OrcaError(
+                'dependency graph has cycles: {}'.format(self.cycles()))
+        return order
+
+    def to_networkx(self):
+        """
+        Convert to a ``networkx.DiGraph``. Nodes have a ``kind`` attribute.
+        Requires networkx.
+
+        Returns
+        -------
+        graph : networkx.DiGraph
+
+        """
+        import networkx as nx
+
+        graph = nx.DiGraph()
+        for node in self.nodes:
+            graph.add_node(node, kind=node[0])
+        graph.add_edges_from(self.edges)
+        return graph
+
+    def to_dot(self):
+        """
+        Render the graph in the Graphviz DOT language.
+
+        Returns
+        -------
+        dot : str
+
+        """
+        def node_id(node):
+            return '"{}:{}"'.format(*node)
+
+        lines = ['digraph orca {']
+        lines.extend(
+            '    {} [label="{}", shape={}];'.format(
+                node_id(n), n[1], _DOT_SHAPES[n[0]])
+            for n in self.nodes)
+        lines.extend(
+            '    {} -> {};'.format(node_id(a), node_id(b))
+            for a, b in self.edges)
+        lines.append('}')
+        return '\n'.join(lines)
+
+
+_DOT_SHAPES = {
+    'table': 'box',
+    'column': 'ellipse',
+    'injectable': 'diamond',
+    'broadcast': 'hexagon',
+    'step': 'doubleoctagon'}
+
+
+def dependency_graph():
+    """
+    Build a graph of the dependencies between everything registered
+    with Orca, based on the argument names and default value expressions
+    of registered functions and on registered broadcasts.
+
+    Local columns appear in the graph only when they are referred to by
+    an expression like 'table.column', and depend on their table.
+    Injecting a whole table is a dependency on the table only,
+    not on its registered columns.
+
+    Returns
+    -------
+    graph : DependencyGraph
+
+    """
+    nodes = OrderedDict()
+    edges = OrderedDict()
+
+    def add_node(node):
+        nodes[node] = None
+        return node
+
+    def input_node(expr):
+        if '.' in expr:
+            table_name = expr.split('.')[0]
+            col = add_node(('column', expr))
+            if tuple(expr.split('.')) not in _COLUMNS:
+                # local columns are provided by their table
+                edges[(input_node(table_name), col)] = None
+            return col
+        elif expr in _TABLES:
+            return add_node(('table', expr))
+        else:
+            return add_node(('injectable', expr))
+
+    def add_inputs(node, argspec):
+        for expr in _argspec_expressions(argspec):
+            edges[(input_node(expr), node)] = None
+
+    for name, table in _TABLES.items():
+        node = add_node(('table', name))
+        if isinstance(table, TableFuncWrapper):
+            add_inputs(node, table._argspec)
+
+    for (table_name, name), col in _COLUMNS.items():
+        node = add_node(('column', '{}.{}'.format(table_name, name)))
+        if isinstance(col, _ColumnFuncWrapper):
+            add_inputs(node, col._argspec)
+
+    for name, inj in _INJECTABLES.items():
+        node = add_node(('injectable', name))
+        if isinstance(inj, _InjectableFuncWrapper):
+            add_inputs(node, inj._argspec)
+
+    for (cast, onto), bc in _BROADCASTS.items():
+        node = add_node(('broadcast', '{}->{}'.format(cast, onto)))
+        edges[(input_node(cast), node)] = None
+        edges[(input_node(onto), node)] = None
+        if bc.cast_on:
+            edges[(input_node('{}.{}'.format(cast, bc.cast_on)), node)] = None
+        if bc.onto_on:
+            edges[(input_node('{}.{}'.format(onto, bc.onto_on)), node)] = None
+
+    for name, step in _STEPS.items():
+        add_inputs(add_node(('step', name)), step._argspec)
+
+    return DependencyGraph(nodes, edges)
+
+
 def write_tables(fname, table_names=None, prefix=None, compress=False, local=False):
     """
     Writes tables to a pandas.HDFStore file.
@@ -2075,15 +4810,158 @@ def write_tables(fname, table_names=None, prefix=None, compress=False, local=Fal
             columns = None
             if local is True:
                 columns = t.local_columns
-            store[key_template.format(t.name)] = t.to_frame(columns=columns)
+            store[key_template.format(t.name)] = t.to_frame(
+                columns=columns, copy=False)
 
 
 iter_step = namedtuple('iter_step', 'step_num,step_name')
 
 
+def _step_batches(steps):
+    """
+    Group consecutive steps that can run concurrently. A step joins the
+    current batch if it declares what it writes, does not read
+    ``iter_step``, and neither reads nor writes anything written by
+    the other steps in the batch (and vice versa).
+
+    Parameters
+    ----------
+    steps : list of str
+
+    Returns
+    -------
+    batches : list of lists of str
+
+    """
+    batches = []
+    reads = writes = None
+
+    for step_name in steps:
+        step = get_step(step_name)
+        step_reads = step._names_read() if step.writes is not None else None
+
+        if step_reads is None or 'iter_step' in step_reads:
+            batches.append([step_name])
+            reads = writes = None
+        elif (reads is not None and
+                not step.writes & (reads | writes) and
+                not step_reads & writes):
+            batches[-1].append(step_name)
+            reads |= step_reads
+            writes |= step.writes
+        else:
+            batches.append([step_name])
+            reads, writes = set(step_reads), set(step.writes)
+
+    return batches
+
+
+def _prefetch_funcs(current_steps, next_steps):
+    """
+    Cached functions providing the inputs of `next_steps` that can be
+    evaluated while `current_steps` run. Functions that read anything
+    the current steps write are excluded. Nothing is prefetched while
+    a step that does not declare what it writes runs, since it may
+    register or update any table or injectable.
+    Step-scoped values and those that use ``iter_step`` are also
+    excluded because they are cleared or change before the next step.
+
+    Parameters
+    ----------
+    current_steps, next_steps : list of str
+
+    Returns
+    -------
+    funcs : list
+        Functions in dependency order.
+
+    """
+    writes = {'iter_step'}
+    for step_name in current_steps:
+        step = get_step(step_name)
+        if step.writes is None:
+            return []
+        writes |= step.writes
+
+    expressions = tz.concat(
+        _argspec_expressions(get_step(step_name)._argspec)
+        for step_name in next_steps)
+
+    funcs = []
+    for func in tz.concat(_func_levels(expressions)):
+        if not func.cache or func.cache_scope == _CS_STEP:
+            continue
+        if isinstance(func, _ColumnFuncWrapper):
+            name = func.table_name
+        else:
+            name = func.name
+        if ({name} | _names_read(func._argspec)) & writes:
+            continue
+        funcs.append(func)
+    return funcs
+
+
+def _start_prefetch(current_steps, next_steps):
+    """
+    Evaluate the cached inputs of `next_steps` in a background thread.
+
+    Returns
+    -------
+    thread : threading.Thread or None
+        None if there is nothing to prefetch.
+
+    """
+    funcs = _prefetch_funcs(current_steps, next_steps) if _CACHING else []
+    if not funcs:
+        return None
+
+    def prefetch():
+        try:
+            with log_start_finish(
+                    'prefetch {} cached functions for step {!r}'.format(
+                        len(funcs), next_steps[0]),
+                    logger):
+                for func in funcs:
+                    func()
+        except Exception:
+            # the step will evaluate its inputs and raise the error itself
+            logger.debug('prefetch failed', exc_info=True)
+
+    thread = threading.Thread(target=prefetch, daemon=True)
+    thread.start()
+    return thread
+
+
+def _run_step_batch(steps, workers):
+    """
+    Run a batch of independent steps concurrently. Arguments are
+    collected and messages are logged and printed in step order.
+
+    """
+    def call(step, kwargs):
+        t = time.time()
+        _evaluate_func(step, kwargs)
+        return time.time() - t
+
+    calls = []
+    for step_name in steps:
+        print('Running step {!r}'.format(step_name))
+        logger.info('start: run step {!r}'.format(step_name))
+        step = get_step(step_name)
+        calls.append((step, step._collect_variables()))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(call, *c) for c in calls]
+
+    for step_name, future in zip(steps, futures):
+        print("Time to execute step '{}': {:.2f} s".format(
+              step_name, future.result()))
+        logger.info('finish: run step {!r}'.format(step_name))
+
+
 def run(steps, iter_vars=None, data_out=None, out_interval=1,
         out_base_tables=None, out_run_tables=None, compress=False,
-        out_base_local=True, out_run_local=True):
+        out_base_local=True, out_run_local=True, workers=1, prefetch=False):
     """
     Run steps in series, optionally repeatedly over some sequence.
     The current iteration variable is set as a global injectable
@@ -2126,8 +5004,20 @@ def run(steps, iter_vars=None, data_out=None, out_interval=1,
     out_run_local: boolean, optional, default True
         For tables in out_run_tables, whether to store only local columns (True)
         or both, local and computed columns (False).
+    workers : int, optional, default 1
+        Number of threads used to run steps. With more than one,
+        consecutive steps registered with ``writes`` that do not
+        conflict with each other are run concurrently. Step-scoped
+        caches are cleared after each such group of steps.
+    prefetch : bool, optional, default False
+        Whether to evaluate the cached tables, columns, and injectables
+        used by the next step in a background thread while a step
+        runs. Only inputs that do not depend on anything the running
+        step writes (see `add_step`) are prefetched, and nothing is
+        prefetched while steps that do not declare their writes run.
     """
     iter_vars = iter_vars or [None]
+    batches = _step_batches(steps) if workers > 1 else [[s] for s in steps]
     max_i = len(iter_vars)
 
     # get the tables to write out
@@ -2157,17 +5047,32 @@ def run(steps, iter_vars=None, data_out=None, out_interval=1,
                     i, var))
 
         t1 = time.time()
-        for j, step_name in enumerate(steps):
-            add_injectable('iter_step', iter_step(j, step_name))
-            print('Running step {!r}'.format(step_name))
-            with log_start_finish(
-                    'run step {!r}'.format(step_name), logger,
-                    logging.INFO):
-                step = get_step(step_name)
-                t2 = time.time()
-                step()
-                print("Time to execute step '{}': {:.2f} s".format(
-                      step_name, time.time() - t2))
+        j = 0
+        for k, batch in enumerate(batches):
+            prefetcher = None
+            if prefetch and k + 1 < len(batches):
+                prefetcher = _start_prefetch(batch, batches[k + 1])
+
+            if len(batch) > 1:
+                j += len(batch)
+                add_injectable('iter_step', iter_step(j - 1, batch[-1]))
+                _run_step_batch(batch, workers)
+            else:
+                step_name = batch[0]
+                add_injectable('iter_step', iter_step(j, step_name))
+                j += 1
+                print('Running step {!r}'.format(step_name))
+                with log_start_finish(
+                        'run step {!r}'.format(step_name), logger,
+                        logging.INFO):
+                    step = get_step(step_name)
+                    t2 = time.time()
+                    step()
+                    print("Time to execute step '{}': {:.2f} s".format(
+                          step_name, time.time() - t2))
+
+            if prefetcher is not None:
+                prefetcher.join()
             clear_cache(scope=_CS_STEP)
 
         print(
@@ -2183,6 +5088,133 @@ def run(steps, iter_vars=None, data_out=None, out_interval=1,
         clear_cache(scope=_CS_ITER)
 
 
+async def run_async(steps, **kwargs):
+    """
+    Run steps from within a running event loop without blocking it.
+    Takes the same arguments as `run`, which is called in a
+    separate thread.
+
+    """
+    loop = _running_loop()
+    return await loop.run_in_executor(None, partial(run, steps, **kwargs))
+
+
+def _run_scenario(conn, steps, overrides, kwargs):
+    """
+    Run steps with some injectables overridden, in a forked process.
+    Sends None or a formatted traceback through `conn`.
+
+    """
+    try:
+        with injectables(**overrides):
+            _invalidate_nodes([('injectable', name) for name in overrides])
+            run(steps, **kwargs)
+        conn.send(None)
+    except BaseException:
+        conn.send(traceback.format_exc())
+    finally:
+        conn.close()
+
+
+def run_scenarios(
+        steps, iter_vars=None, scenarios=None, workers=None, data_out=None,
+        **kwargs):
+    """
+    Run the same steps for several scenarios that differ in the values
+    of some injectables.
+
+    Each scenario runs in its own process forked from this one, so the
+    registered tables and cached values are shared copy-on-write rather
+    than loaded again. Cached values that depend on a scenario's
+    overridden injectables are cleared in that scenario's process.
+    Calling `precompute` first shares the cached base data between
+    all scenarios. Requires the fork start method (not available on
+    Windows).
+
+    Parameters
+    ----------
+    steps : list of str
+        List of steps to run identified by their name.
+    iter_vars : iterable, optional
+        Passed to `run`.
+    scenarios : dict
+        Maps scenario names to dicts of injectable names and values.
+    workers : int, optional
+        Maximum number of scenarios run at the same time. Defaults to
+        the number of CPUs.
+    data_out : str, optional
+        Output file name for each scenario, containing ``{scenario}``
+        to be replaced by the scenario name. See `run`.
+    **kwargs
+        Other arguments passed to `run`.
+
+    Returns
+    -------
+    outputs : dict
+        Maps scenario names to output file names (or None if
+        `data_out` is not given).
+
+    """
+    try:
+        context = multiprocessing.get_context('fork')
+    except ValueError:
+        raise OrcaError('run_scenarios requires the fork start method')
+
+    if data_out and '{scenario}' not in data_out:
+        raise ValueError('data_out must contain {scenario}')
+
+    scenarios = scenarios or {}
+    workers = workers or os.cpu_count() or 1
+    outputs = {
+        name: data_out.format(scenario=name) if data_out else None
+        for name in scenarios}
+
+    pending = list(scenarios)
+    running = {}
+    errors = {}
+
+    # keep existing objects out of collections in the children so
+    # their memory pages are not touched and stay shared
+    freeze = hasattr(gc, 'freeze')  # Python >= 3.7
+    if freeze:
+        gc.freeze()
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                name = pending.pop(0)
+                logger.debug('starting scenario {!r}'.format(name))
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(
+                    target=_run_scenario,
+                    args=(sender, steps, scenarios[name], dict(
+                        kwargs, iter_vars=iter_vars, data_out=outputs[name])))
+                process.start()
+                sender.close()
+                running[receiver] = (name, process)
+
+            # ready once the scenario reports back or its process exits
+            for receiver in multiprocessing.connection.wait(list(running)):
+                name, process = running.pop(receiver)
+                try:
+                    error = receiver.recv()
+                except EOFError:
+                    error = 'exited with code {}'.format(process.exitcode)
+                process.join()
+                receiver.close()
+                logger.debug('finished scenario {!r}'.format(name))
+                if error is not None:
+                    errors[name] = error
+    finally:
+        if freeze:
+            gc.unfreeze()
+
+    if errors:
+        raise OrcaError('scenarios {} failed:\n{}'.format(
+            sorted(errors), '\n'.join(errors.values())))
+
+    return outputs
+
+
 @contextmanager
 def injectables(**kwargs):
     """
@@ -2197,8 +5229,16 @@ def injectables(**kwargs):
 
     original = _INJECTABLES.copy()
     _INJECTABLES.update(kwargs)
+    for name in kwargs:
+        _INJECTABLE_VERSIONS[name] = next(_VERSIONS)
+        _index_reads(('injectable', name), kwargs[name])
+    _PLANS.clear()
     yield
     _INJECTABLES = original
+    for name in kwargs:
+        _INJECTABLE_VERSIONS[name] = next(_VERSIONS)
+        _index_reads(('injectable', name), original.get(name))
+    _PLANS.clear()
 
 
 @contextmanager
@@ -2208,7 +5248,8 @@ def temporary_tables(**kwargs):
 
     Tables will be returned to their original state when the context
     manager exits. Caching is not enabled for tables registered via
-    this function.
+    this function. Cached columns of the temporary tables are cleared
+    on exit so they are not reused with the original tables.
 
     """
     global _TABLES
@@ -2223,6 +5264,12 @@ def temporary_tables(**kwargs):
     yield
 
     _TABLES = original
+    _PLANS.clear()
+
+    for k in kwargs:
+        _index_reads(('table', k), original.get(k))
+        for col in _COLUMNS_BY_TABLE.get(k, {}).values():
+            col.clear_cached()
 
 
 def eval_variable(name, **kwargs):
@@ -2251,6 +5298,40 @@ def eval_variable(name, **kwargs):
         return vars[name]
 
 
+def eval_variables(names, **kwargs):
+    """
+    Evaluate several variables together and return the results
+    as would be injected into a function. Any keyword arguments are
+    temporarily set as injectables.
+
+    Table, column, and injectable functions shared by several of the
+    variables are evaluated only once, even when they are not cached.
+
+    Parameters
+    ----------
+    names : sequence of str
+        Names of variables to evaluate.
+        Use variable expressions to specify columns.
+
+    Returns
+    -------
+    variables : dict
+        Maps each name to its value, see `eval_variable`.
+
+    """
+    global _EVAL_MEMO
+
+    names = list(names)
+    original = _EVAL_MEMO
+    if original is None:
+        _EVAL_MEMO = {}
+    try:
+        with injectables(**kwargs):
+            return _collect_variables(names, names)
+    finally:
+        _EVAL_MEMO = original
+
+
 def eval_step(name, **kwargs):
     """
     Evaluate a step as would be done within the pipeline environment
@@ -255,3 +255,21 @@ def test_merge_tables_dup_columns():
         'zone_id': [1, 1, 2]
     })
     assert_frames_equal(df, expected)
+
+
+def test_merge_tables_missing_keys():
+    df_a = pd.DataFrame({'a': [0, 1]}, index=['a0', 'a1'])
+    df_b = pd.DataFrame(
+        {'b': [2, 3, 4, 5], 'a_id': ['a1', 'a9', 'a0', 'a1']},
+        index=['b0', 'b1', 'b2', 'b3'])
+    orca.add_table('a', df_a)
+    orca.add_table('b', df_b)
+    orca.broadcast(cast='a', onto='b', cast_index=True, onto_on='a_id')
+
+    df = orca.merge_tables(target='b', tables=['a', 'b'])
+
+    # rows keep the order of the table merged onto
+    expected = pd.DataFrame(
+        {'b': [2, 4, 5], 'a_id': ['a1', 'a0', 'a1'], 'a': [1, 0, 1]},
+        index=['b0', 'b2', 'b3'])
+    pd.testing.assert_frame_equal(df, expected)
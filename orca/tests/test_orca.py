@@ -2,9 +2,15 @@
 # Copyright (C) 2022 UrbanSim Inc.
 # See full license in LICENSE.
 
+import asyncio
+import multiprocessing
 import os
+import sys
 import tempfile
+import threading
+import time
 
+import numpy as np
 import pandas as pd
 import pandas.testing as pdt
 import pytest
@@ -12,15 +18,32 @@ import pytest
 from .. import orca
 from ..utils.testing import assert_frames_equal
 
+requires_fork = pytest.mark.skipif(
+    'fork' not in multiprocessing.get_all_start_methods(),
+    reason='fork start method not available')
+requires_shared_memory = pytest.mark.skipif(
+    orca.shared_memory is None or sys.platform == 'win32',
+    reason='process executor not available')
+
 
 def setup_function(func):
     orca.clear_all()
     orca.enable_cache()
+    orca.set_cache_budget(None)
+    orca.set_disk_cache(None)
+    orca.set_cache_spill(None)
+    orca.set_column_workers(1)
+    orca.set_process_pool()
 
 
 def teardown_function(func):
     orca.clear_all()
     orca.enable_cache()
+    orca.set_cache_budget(None)
+    orca.set_disk_cache(None)
+    orca.set_cache_spill(None)
+    orca.set_column_workers(1)
+    orca.set_process_pool()
 
 
 @pytest.fixture
@@ -231,6 +254,19 @@ def test_columns_for_table():
     t2_cols = orca._columns_for_table('table2')
     assert 'col20' in t2_cols and 'col21' in t2_cols
 
+    assert orca.list_columns_for_table('table3') == []
+    assert orca._columns_for_table('table3') == {}
+
+    # re-registering a column replaces it in the per-table index
+    orca.add_column(
+        'table1', 'col10', pd.Series([7, 8, 9], index=['a', 'b', 'c']))
+    assert orca.list_columns_for_table('table1') == ['col10', 'col11']
+    assert orca._columns_for_table('table1')['col10'] is \
+        orca._COLUMNS[('table1', 'col10')]
+
+    orca.clear_all()
+    assert orca.list_columns_for_table('table1') == []
+
 
 def test_columns_and_tables(df):
     orca.add_table('test_frame', df)
@@ -453,6 +489,299 @@ def test_column_cache_disabled(df):
     pdt.assert_series_equal(c()(), series * 3)
 
 
+def test_to_frame_workers(df):
+    orca.add_table('table', df)
+    threads = set()
+    order = []
+
+    @orca.column('table')
+    def c1(a='table.a'):
+        threads.add(threading.current_thread().name)
+        order.append('c1')
+        return a * 2
+
+    @orca.column('table')
+    def c2(c1='table.c1'):
+        order.append('c2')
+        return c1 * 2
+
+    @orca.column('table')
+    def c3(b='table.b'):
+        threads.add(threading.current_thread().name)
+        return b * 2
+
+    orca.add_column('table', 'c4', df.a * 4)
+
+    expected = orca.get_table('table').to_frame()
+    assert list(expected.columns) == ['a', 'b', 'c1', 'c2', 'c3', 'c4']
+
+    del order[:]
+    threads.clear()
+    result = orca.get_table('table').to_frame(workers=4)
+    pdt.assert_frame_equal(result, expected)
+    assert order.index('c2') > order.index('c1')
+    assert threading.current_thread().name not in threads
+
+    orca.set_column_workers(2)
+    result = orca.get_table('table').to_frame(['c3', 'a', 'c2'])
+    pdt.assert_frame_equal(result, expected[['a', 'c2', 'c3']])
+
+
+def _column_in_process(a='table.a', factor='factor'):
+    return a.map(lambda x: x * factor + os.getpid() * 10)
+
+
+@requires_shared_memory
+@pytest.mark.parametrize(
+    'start_method', [pytest.param('fork', marks=requires_fork), 'spawn'])
+def test_column_process_executor(df, start_method):
+    orca.set_process_pool(workers=1, start_method=start_method)
+    orca.add_table('table', df)
+    orca.add_injectable('factor', 3)
+    orca.add_column(
+        'table', 'result', _column_in_process, cache=True,
+        executor='process')
+
+    result = orca.get_table('table').result
+    pids = (result - df.a * 3) // 10
+    assert len(set(pids)) == 1
+    assert pids.iloc[0] != os.getpid()
+
+    pdt.assert_series_equal(orca.get_table('table').result, result)
+    stats = orca.cache_stats().loc[('column', 'table.result')]
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+
+    def uses_table(table):
+        return table.a
+
+    orca.add_column('table', 'bad', uses_table, executor='process')
+    with pytest.raises(orca.OrcaError):
+        orca.get_table('table').bad
+
+    with pytest.raises(ValueError):
+        orca.add_column('table', 'bad', uses_table, executor='thread')
+
+
+def test_get_column_copy_on_write(df):
+    wrapped = orca.add_table('table', df, copy_col='cow')
+
+    @orca.column('table')
+    def computed(a='table.a'):
+        return a * 2
+
+    col = wrapped.a
+    assert np.shares_memory(col.values, df.a.values)
+    if orca._pandas_copy_on_write():
+        col['x'] = 100
+        col = wrapped.a
+    else:
+        with pytest.raises(ValueError):
+            col['x'] = 100
+    assert df.a['x'] == 1
+    pdt.assert_series_equal(col * 2, df.a * 2)
+
+    copied = col.copy()
+    copied['x'] = 100
+    assert df.a['x'] == 1
+
+    if not orca._pandas_copy_on_write():
+        assert not wrapped.computed.values.flags.writeable
+    pdt.assert_series_equal(wrapped.computed, df.a * 2, check_names=False)
+
+    # columns of the table itself can still be updated
+    wrapped['a'] = df.a + 1
+    assert wrapped.a['x'] == 2
+
+    try:
+        pd.get_option('mode.copy_on_write')
+    except KeyError:  # pandas < 1.5 has no copy-on-write mode
+        pass
+    else:
+        with pd.option_context('mode.copy_on_write', True):
+            col = wrapped.a
+            col['x'] = 100
+            assert wrapped.a['x'] == 2
+
+    # later updates to the table do not change columns handed out
+    col = wrapped.a
+    wrapped.update_col_from_series('a', pd.Series([99], index=['x']))
+    assert col.tolist() == [2, 3, 4]
+    assert wrapped.a.tolist() == [99, 3, 4]
+
+
+def test_to_frame_copy(df):
+    wrapped = orca.add_table('table', df)
+
+    @orca.column('table', cache=True)
+    def c(a='table.a'):
+        return a * 2
+
+    frame = wrapped.to_frame()
+    assert list(frame.columns) == ['a', 'b', 'c']
+    assert not np.shares_memory(frame['a'].values, df['a'].values)
+
+    frame = wrapped.to_frame(copy=False)
+    pdt.assert_frame_equal(frame, wrapped.to_frame())
+    assert np.shares_memory(frame['a'].values, df['a'].values)
+    assert np.shares_memory(
+        frame['c'].values, orca._COLUMN_CACHE[('table', 'c')].value.values)
+
+    frame = wrapped.to_frame(['c', 'b'], copy=False)
+    assert list(frame.columns) == ['b', 'c']
+
+
+def test_columns_storage(df):
+    df = df.assign(
+        t=pd.date_range('2020-01-01', periods=3, tz='US/Pacific'),
+        cat=pd.Categorical(['u', 'v', 'u']))
+    wrapped = orca.add_table('table', df, storage='columns')
+
+    @orca.column('table')
+    def c(a='table.a'):
+        return a * 2
+
+    assert wrapped.local_columns == ['a', 'b', 't', 'cat']
+    assert len(wrapped) == 3
+    pdt.assert_index_equal(wrapped.index, df.index)
+    pdt.assert_frame_equal(wrapped.local, df)
+    pdt.assert_series_equal(wrapped.t, df.t)
+    pdt.assert_series_equal(wrapped.cat, df.cat)
+    pdt.assert_frame_equal(
+        wrapped.to_frame(), df.assign(c=df.a * 2), check_names=False)
+
+    new = pd.Series([7., 8., 9.], index=df.index)
+    wrapped['d'] = new
+    assert np.shares_memory(wrapped._arrays['d'], new.values)
+    wrapped['e'] = 1
+    wrapped['b'] = pd.Series([3, 1], index=['z', 'x'])
+    assert wrapped.local_columns == ['a', 'b', 't', 'cat', 'd', 'e']
+    assert wrapped.e.tolist() == [1, 1, 1]
+    assert wrapped.b.fillna(0).tolist() == [1, 0, 3]
+
+    wrapped.update_col_from_series('d', pd.Series([0.], index=['y']))
+    assert wrapped.d.tolist() == [7., 0., 9.]
+    assert new.tolist() == [7., 8., 9.]
+    with pytest.raises(KeyError):
+        wrapped.update_col_from_series('d', pd.Series([0.], index=['q']))
+
+    # the local frame is a new DataFrame each time
+    wrapped.local['a'] = 0
+    assert wrapped.a.tolist() == [1, 2, 3]
+
+    with pytest.raises(ValueError):
+        orca.add_table('table', df, storage='rows')
+
+
+def test_compact_frame():
+    df = pd.DataFrame({
+        'small': [1, 2, 3, 4],
+        'big': [1, 2, 3, 2 ** 40],
+        'unsigned': np.array([1, 2, 3, 300], dtype=np.uint64),
+        'exact': [0.5, 1.5, np.nan, 2.0],
+        'inexact': [0.1, 0.2, 0.3, 0.4],
+        'lossy': [0.1, 0.2, 0.3, 0.4],
+        'flag': [True, False, True, True],
+        'names': ['a', 'b', 'a', 'a'],
+        'unique': ['a', 'b', 'c', 'd']})
+
+    result = orca.compact_frame(df)
+    assert result.small.dtype == np.int32
+    assert result.big.dtype == np.int64
+    assert result.unsigned.dtype == np.uint32
+    assert result.exact.dtype == np.float64
+    assert result.flag.dtype == bool
+    assert result.names.dtype == 'category'
+    assert result.unique.dtype == df.unique.dtype
+    pdt.assert_frame_equal(
+        result.astype(df.dtypes.to_dict()), df)
+
+    result = orca.compact_frame(
+        df, floats=True, allow_lossy=['lossy'],
+        small_ints=['small', 'unsigned'])
+    assert result.small.dtype == np.int8
+    assert result.unsigned.dtype == np.uint16
+    assert result.exact.dtype == np.float32
+    assert result.inexact.dtype == np.float64
+    assert result.lossy.dtype == np.float32
+    assert df.small.dtype == np.int64
+
+    orca.add_table('table', df, compact=True)
+    assert orca.get_table('table').small.dtype == np.int32
+
+    @orca.table(compact={'category_ratio': 0, 'small_ints': ['small']})
+    def func_table():
+        return df
+
+    table = orca.get_table('func_table')
+    assert table.small.dtype == np.int8
+    assert table.names.dtype == df.names.dtype
+
+
+def test_update_compacted_column():
+    df = pd.DataFrame({'age': [30, 40, 50]})
+    wrapped = orca.add_table(
+        'table', df, compact={'small_ints': ['age']})
+    assert wrapped.age.dtype == np.int8
+
+    # integers of other widths are cast if they fit
+    wrapped.update_col_from_series('age', pd.Series([60], index=[1]))
+    assert wrapped.age.tolist() == [30, 60, 50]
+    assert wrapped.age.dtype == np.int8
+
+    for cast in (False, True):
+        with pytest.raises(ValueError):
+            wrapped.update_col_from_series(
+                'age', pd.Series([300], index=[1]), cast=cast)
+    assert wrapped.age.tolist() == [30, 60, 50]
+
+
+def test_memory_report():
+    n = 1000
+    df = pd.DataFrame(
+        {'a': np.arange(n, dtype=float), 'b': np.arange(n)},
+        index=pd.Index(np.arange(n) * 2))
+    orca.add_table('table', df, copy_col='cow')
+    orca.add_column('table', 'series', pd.Series(np.zeros(n), index=df.index))
+
+    @orca.column('table', cache=True)
+    def same(a='table.a'):
+        return a
+
+    @orca.column('table', cache=True)
+    def doubled(a='table.a'):
+        return a * 2
+
+    @orca.table(cache=True)
+    def other():
+        return pd.DataFrame({'x': np.ones(10)})
+
+    orca.add_injectable('values', np.zeros(100))
+
+    @orca.injectable(autocall=False, memoize=True)
+    def ones(size):
+        return np.ones(size)
+
+    orca.get_table('table').to_frame()
+    orca.get_table('other')
+    orca.get_injectable('ones')(10)
+    orca.get_injectable('ones')(20)
+
+    report = orca.memory_report().set_index(['kind', 'name'])
+    assert report.loc[('local', '<index>'), 'nbytes'] == 8 * n
+    assert report.loc[('local', 'a'), 'nbytes'] == 8 * n
+    assert report.loc[('local', 'a'), 'shared_nbytes'] == 8 * n
+    assert report.loc[('local', 'a'), 'table'] == 'table'
+    assert report.loc[('series', 'series'), 'nbytes'] == 8 * n
+    # a view of a local column is counted once
+    assert report.loc[('column_cache', 'same'), 'nbytes'] == 0
+    assert report.loc[('column_cache', 'same'), 'shared_nbytes'] == 16 * n
+    assert report.loc[('column_cache', 'doubled'), 'nbytes'] == 8 * n
+    assert report.loc[('table_cache', 'other'), 'nbytes'] >= 80
+    assert report.loc[('injectable', 'values'), 'nbytes'] == 800
+    assert report.loc[('memoized', 'ones'), 'nbytes'] == 240
+
+
 def test_update_col(df):
     wrapped = orca.add_table('table', df)
 
@@ -479,6 +808,187 @@ def test_update_col(df):
         wrapped['a'], pd.Series([1, 99, 3], index=df.index, name='a'))
 
 
+@pytest.mark.parametrize('storage', ['frame', 'columns'])
+def test_update_col_from_series_positions(df, storage):
+    wrapped = orca.add_table('table', df, storage=storage)
+    labels = pd.Index(['z', 'x'])
+
+    wrapped.update_col_from_series('a', pd.Series([30, 10], index=labels))
+    positions = wrapped._positions_cache[2]
+    np.testing.assert_array_equal(positions, [2, 0])
+
+    # the positions for the same labels are reused
+    wrapped.update_col_from_series('b', pd.Series([60, 40], index=labels))
+    assert wrapped._positions_cache[2] is positions
+    pdt.assert_frame_equal(
+        wrapped.local,
+        pd.DataFrame({'a': [10, 2, 30], 'b': [40, 5, 60]}, index=df.index))
+
+    with pytest.raises(KeyError):
+        wrapped.update_col_from_series('a', pd.Series([1], index=['q']))
+
+
+def test_update_col_from_series_duplicate_index():
+    wrapped = orca.add_table(
+        'table', pd.DataFrame({'a': [1, 2, 3]}, index=['x', 'x', 'y']))
+    wrapped.update_col_from_series('a', pd.Series([9], index=['x']))
+    np.testing.assert_array_equal(wrapped.local.a, [9, 9, 3])
+
+
+@pytest.mark.parametrize('storage', ['frame', 'columns'])
+def test_update_cols_from_frame(df, storage):
+    wrapped = orca.add_table('table', df, storage=storage)
+
+    @orca.column('table', cache=True)
+    def total(a='table.a', b='table.b'):
+        return a + b
+
+    np.testing.assert_array_equal(wrapped.total, [5, 7, 9])
+
+    wrapped.update_cols_from_frame(
+        pd.DataFrame({'b': [50, 70], 'a': [10, 30]}, index=['x', 'z']))
+    pdt.assert_frame_equal(
+        wrapped.local,
+        pd.DataFrame({'a': [10, 2, 30], 'b': [50, 5, 70]}, index=df.index))
+    np.testing.assert_array_equal(wrapped.total, [60, 7, 100])
+
+    # nothing is updated if a column has the wrong type
+    with pytest.raises(ValueError):
+        wrapped.update_cols_from_frame(
+            pd.DataFrame({'a': [0], 'b': [0.5]}, index=['y']))
+    np.testing.assert_array_equal(wrapped.local.a, [10, 2, 30])
+
+    wrapped.update_cols_from_frame(
+        pd.DataFrame({'a': [0], 'b': [0.5]}, index=['y']), cast=True)
+    pdt.assert_frame_equal(
+        wrapped.local,
+        pd.DataFrame({'a': [10, 0, 30], 'b': [50, 0, 70]}, index=df.index))
+
+
+def test_positions(df):
+    wrapped = orca.add_table('table', df)
+    labels = pd.Index(['z', 'q', 'x'])
+
+    positions = wrapped.positions(labels)
+    np.testing.assert_array_equal(positions, [2, -1, 0])
+    assert not positions.flags.writeable
+    assert wrapped.positions(labels) is positions
+    np.testing.assert_array_equal(wrapped.positions(['y']), [1])
+
+    # replacing the index drops the kept positions
+    wrapped.local = df.set_axis(['z', 'y', 'x'])
+    np.testing.assert_array_equal(wrapped.positions(labels), [0, -1, 2])
+
+    @orca.table(cache=True)
+    def computed():
+        return df
+
+    np.testing.assert_array_equal(
+        orca.get_table('computed').positions(labels), [2, -1, 0])
+
+
+def test_update_col_invalidates_dependents(df):
+    wrapped = orca.add_table('table', df)
+    orca.add_table('other', pd.DataFrame({'c': [1, 2, 3]}, index=df.index))
+
+    @orca.column('table', cache=True)
+    def a2(col='table.a'):
+        return col * 2
+
+    @orca.column('table')
+    def a4(col='table.a2'):
+        return col * 2
+
+    @orca.column('table', cache=True)
+    def a8(col='table.a4'):
+        return col * 2
+
+    @orca.column('table', cache=True)
+    def b2(col='table.b'):
+        return col * 2
+
+    @orca.column('other', cache=True)
+    def c2(other):
+        return other.c * 2
+
+    @orca.injectable(cache=True)
+    def a_sum(col='table.a8'):
+        return col.sum()
+
+    assert orca.get_injectable('a_sum') == 48
+    orca.get_table('table').b2
+    orca.get_table('other').c2
+    assert ('table', 'b2') in orca._COLUMN_CACHE
+    assert ('other', 'c2') in orca._COLUMN_CACHE
+
+    wrapped.update_col('a', pd.Series([2, 3, 4], index=df.index))
+    assert ('table', 'a2') not in orca._COLUMN_CACHE
+    assert ('table', 'a8') not in orca._COLUMN_CACHE
+    assert 'a_sum' not in orca._INJECTABLE_CACHE
+    assert ('table', 'b2') in orca._COLUMN_CACHE
+    assert ('other', 'c2') in orca._COLUMN_CACHE
+    assert orca.get_injectable('a_sum') == 72
+
+    wrapped.update_col_from_series('a', pd.Series([10], index=['x']))
+    assert orca.get_injectable('a_sum') == 136
+
+    wrapped['b'] = pd.Series([0, 0, 0], index=df.index)
+    pdt.assert_series_equal(
+        orca.get_table('table').b2,
+        pd.Series([0, 0, 0], index=df.index, name='b'))
+    assert 'a_sum' in orca._INJECTABLE_CACHE
+
+
+def test_update_col_invalidates_whole_table_readers(df):
+    wrapped = orca.add_table('table', df)
+
+    @orca.table(cache=True)
+    def summary(table):
+        return table.to_frame().sum().to_frame('total')
+
+    assert orca.get_table('summary').total['a'] == 6
+    wrapped.update_col('b', pd.Series([0, 0, 0], index=df.index))
+    assert 'summary' not in orca._TABLE_CACHE
+    assert orca.get_table('summary').total['b'] == 0
+
+
+def test_update_col_keeps_updated_tables():
+    orca.add_table('persons', pd.DataFrame({'age': [20, 30, 40]}))
+
+    @orca.table(cache=True)
+    def households(persons):
+        return pd.DataFrame({'size': [1, 1, 1]}, index=persons.index)
+
+    @orca.step()
+    def step_a(households):
+        households.update_col('size', pd.Series([5, 5, 5]))
+
+    @orca.step()
+    def step_b(persons):
+        persons.update_col('age', persons.age + 1)
+
+    orca.run(['step_a', 'step_b'])
+    assert orca.get_table('households').size.tolist() == [5, 5, 5]
+
+
+def test_update_col_invalidation_index(df):
+    # readers may be registered before the tables they read
+    @orca.injectable(cache=True)
+    def total(table):
+        return table.a.sum()
+
+    wrapped = orca.add_table('table', df)
+    assert orca.get_injectable('total') == 6
+    wrapped.update_col('a', pd.Series([2, 3, 4], index=df.index))
+    assert orca.get_injectable('total') == 9
+
+    # re-registering a reader replaces its recorded inputs
+    orca.add_injectable('total', lambda: 0, cache=True)
+    assert ('injectable', 'total') not in orca._READERS.get(
+        ('table', 'table'), set())
+    assert orca._READS[('injectable', 'total')] == set()
+
+
 class _FakeTable(object):
     def __init__(self, name, columns):
         self.name = name
@@ -686,6 +1196,39 @@ def test_collect_variables(df):
     pdt.assert_series_equal(things['df_a'], df['a'])
 
 
+def test_collect_variables_plans(df):
+    orca.add_table('df', df)
+    orca.add_injectable('answer', 42)
+    orca.add_injectable('other', 1)
+
+    names = ['df', 'answer', 'label']
+    expressions = ['df.a']
+    assert orca._collect_variables(names, expressions)['answer'] == 42
+    plan = orca._PLANS[(tuple(names), tuple(expressions))]
+    orca._collect_variables(names, expressions)
+    assert orca._PLANS[(tuple(names), tuple(expressions))] is plan
+
+    # unrelated registrations keep the plan
+    orca.add_injectable('other', 2)
+    assert orca._PLANS[(tuple(names), tuple(expressions))] is plan
+
+    orca.add_injectable('answer', 43)
+    assert orca._collect_variables(names, expressions)['answer'] == 43
+
+    with orca.injectables(answer=44):
+        assert orca._collect_variables(names, expressions)['answer'] == 44
+    assert orca._collect_variables(names, expressions)['answer'] == 43
+
+    orca.add_table('df', df * 2)
+    pdt.assert_series_equal(
+        orca._collect_variables(names, expressions)['label'], df.a * 2)
+
+    orca.add_table('answer', df)
+    assert isinstance(
+        orca._collect_variables(names, expressions)['answer'],
+        orca.DataFrameWrapper)
+
+
 def test_collect_variables_expression_only(df):
     @orca.table()
     def table():
@@ -857,6 +1400,52 @@ def test_memoized_injectable_cache_off():
     assert getx() == 'ay'
 
 
+def test_memoized_injectable_maxsize():
+    calls = []
+
+    @orca.injectable(autocall=False, memoize=True, maxsize=2)
+    def x(s):
+        calls.append(s)
+        return s * 2
+
+    x = orca.get_injectable('x')
+    assert x(1) == 2
+    assert x(2) == 4
+    assert x(1) == 2
+    assert x(3) == 6
+    assert list(x.cache) == [((1,), None), ((3,), None)]
+    assert x(2) == 4
+    assert calls == [1, 2, 3, 2]
+    assert x.cache_info() == orca.MemoInfo(
+        hits=1, misses=4, maxsize=2, currsize=2)
+
+
+def test_memoized_injectable_vectorized():
+    calls = []
+
+    @orca.injectable(autocall=False, memoize=True, vectorized=True)
+    def x(s):
+        calls.append(np.atleast_1d(s).tolist())
+        return s * 2
+
+    x = orca.get_injectable('x')
+    assert x(1) == 2
+    keys = pd.Series([1, 2, 2, 3], index=['a', 'b', 'c', 'd'])
+    pdt.assert_series_equal(x(keys), keys * 2)
+    assert calls == [[1], [2, 3]]
+    assert list(x(np.array([3, 1]))) == [6, 2]
+    assert x(3) == 6
+    assert len(calls) == 2
+    assert x.cache_info().currsize == 3
+
+    # NaN keys are computed once and mapped back by position
+    result = x(np.array([1., np.nan, np.nan]))
+    np.testing.assert_array_equal(result, [2., np.nan, np.nan])
+    assert calls[-1][0] != calls[-1][0]
+    x(np.array([np.nan]))
+    assert len(calls) == 3
+
+
 def test_clear_cache_all(df):
     @orca.table(cache=True)
     def table():
@@ -980,6 +1569,407 @@ def test_cache_scope(df):
     orca.run(['m1', 'm2'], iter_vars=[1000, 2000])
 
 
+def test_cache_budget_lru():
+    index = pd.RangeIndex(100)
+    orca.add_table('t', pd.DataFrame(index=index))
+    calls = []
+
+    def make_column(name):
+        def func():
+            calls.append(name)
+            return pd.Series(0., index=index)
+        return func
+
+    for name in ['c1', 'c2', 'c3']:
+        orca.add_column('t', name, make_column(name), cache=True)
+
+    nbytes = orca._value_nbytes(pd.Series(0., index=index))
+    orca.set_cache_budget(2 * nbytes)
+    assert orca.get_cache_budget() == (2 * nbytes, 'lru')
+
+    t = orca.get_table('t')
+    t.c1
+    t.c2
+    t.c1
+    t.c3
+    assert ('t', 'c2') not in orca._COLUMN_CACHE
+    assert ('t', 'c1') in orca._COLUMN_CACHE
+    assert ('t', 'c3') in orca._COLUMN_CACHE
+
+    # evicted values are recomputed when requested again
+    t.c2
+    assert calls == ['c1', 'c2', 'c3', 'c2']
+    assert sum(
+        item.nbytes for item in orca._COLUMN_CACHE.values()) <= 2 * nbytes
+    assert list(orca.cache_stats()['evictions']) == [1, 1, 0]
+
+
+def test_cache_budget_keeps_tables():
+    index = pd.RangeIndex(100)
+
+    @orca.table(cache=True)
+    def hh():
+        return pd.DataFrame({'x': np.zeros(100)}, index=index)
+
+    @orca.column('hh', cache=True)
+    def big():
+        return pd.Series(0., index=index)
+
+    orca.set_cache_budget(orca._value_nbytes(pd.Series(0., index=index)))
+    orca.get_table('hh').update_col('x', pd.Series(1., index=index))
+
+    # caching the column takes the cache over budget,
+    # the updated table must not be evicted
+    orca.get_table('hh').big
+    assert 'hh' in orca._TABLE_CACHE
+    assert (orca.get_table('hh').x == 1).all()
+
+
+def test_cache_budget_cost():
+    index = pd.RangeIndex(100)
+    orca.add_table('t', pd.DataFrame(index=index))
+
+    @orca.column('t', cache=True)
+    def cheap():
+        return pd.Series(0., index=index)
+
+    @orca.column('t', cache=True)
+    def expensive():
+        return pd.Series(0., index=index)
+
+    orca.get_table('t').expensive
+    orca.get_table('t').cheap
+    orca._COLUMN_CACHE[('t', 'expensive')] = \
+        orca._COLUMN_CACHE[('t', 'expensive')]._replace(cost=10.)
+
+    # setting a budget sizes values cached without one
+    nbytes = orca._value_nbytes(pd.Series(0., index=index))
+    orca.set_cache_budget(nbytes, policy='cost')
+    assert list(orca._COLUMN_CACHE) == [('t', 'expensive')]
+
+
+def test_cache_spill(tmpdir):
+    index = pd.RangeIndex(100)
+    orca.add_table('t', pd.DataFrame(index=index))
+    calls = []
+
+    @orca.column('t', cache=True)
+    def c1():
+        calls.append('c1')
+        return pd.Series(range(100), index=index, dtype='float')
+
+    @orca.column('t', cache=True, cache_scope='iteration')
+    def c2():
+        calls.append('c2')
+        return pd.Series(range(100, 200), index=index, dtype='float')
+
+    @orca.column('t', cache=True)
+    def c3():
+        calls.append('c3')
+        return pd.Series(list('abcd') * 25, index=index)
+
+    orca.set_cache_spill(str(tmpdir))
+    nbytes = orca._value_nbytes(orca.get_table('t').c3)
+    orca.set_cache_budget(nbytes)
+
+    # c3 has object data and cannot be spilled
+    orca.get_table('t').c2
+    orca.get_table('t').c1
+    orca.get_table('t').c3
+    assert calls == ['c3', 'c2', 'c1', 'c3']
+    assert len(tmpdir.listdir()) == 2
+    assert orca.cache_stats()['nbytes'].sum() <= nbytes
+
+    # spilled values are loaded back instead of recomputed
+    c1 = orca.get_table('t').c1
+    c2 = orca.get_table('t').c2
+    assert calls == ['c3', 'c2', 'c1', 'c3']
+    pdt.assert_series_equal(
+        c1, pd.Series(range(100), index=index, dtype='float'))
+    pdt.assert_series_equal(
+        c2, pd.Series(range(100, 200), index=index, dtype='float'))
+
+    # spill files go away with their cache scope
+    orca.clear_cache(scope='iteration')
+    assert len(tmpdir.listdir()) == 1
+    orca.clear_cache()
+    assert tmpdir.listdir() == []
+
+
+def test_cache_budget_bad_policy():
+    with pytest.raises(ValueError):
+        orca.set_cache_budget(100, policy='fifo')
+
+
+def test_disk_cache(df, tmpdir):
+    orca.set_disk_cache(str(tmpdir))
+    assert orca.get_disk_cache() == str(tmpdir)
+    orca.add_table('table', df)
+    orca.add_injectable('x', 2)
+    calls = []
+
+    @orca.table(cache=True)
+    def doubled(table, x):
+        calls.append('doubled')
+        return table.to_frame() * x
+
+    @orca.column('table', cache=True)
+    def c(col='table.a', x='x'):
+        calls.append('c')
+        return col * x
+
+    @orca.column('table', cache=True, cache_scope='step')
+    def d(col='table.a'):
+        calls.append('d')
+        return col
+
+    def evaluate():
+        return (orca.get_table('doubled').to_frame(),
+                orca.get_table('table').to_frame())
+
+    frame1, table1 = evaluate()
+    assert sorted(calls) == ['c', 'd', 'doubled']
+    assert len(tmpdir.listdir()) == 2
+
+    # a fresh in-memory cache is filled from disk
+    orca.clear_cache()
+    frame2, table2 = evaluate()
+    assert sorted(calls) == ['c', 'd', 'd', 'doubled']
+    pdt.assert_frame_equal(frame1, frame2)
+    pdt.assert_frame_equal(table1, table2)
+
+    # changed inputs make new entries
+    orca.clear_cache()
+    orca.add_injectable('x', 3)
+    frame3, _ = evaluate()
+    pdt.assert_frame_equal(frame3[['a', 'b']], df * 3)
+    assert calls.count('doubled') == 2
+    assert len(tmpdir.listdir()) == 4
+
+    orca.clear_disk_cache()
+    assert tmpdir.listdir() == []
+
+
+def test_disk_cache_unstorable(tmpdir):
+    orca.set_disk_cache(str(tmpdir))
+    orca.add_table('t', pd.DataFrame({'a': [1, 2, 3]}))
+
+    @orca.column('t', cache=True)
+    def cat(a='t.a'):
+        return a.astype(str).astype('category')
+
+    # fixed format HDF5 cannot store categoricals
+    result = orca.get_table('t').cat
+    assert result.dtype == 'category'
+    assert tmpdir.listdir() == []
+
+    tmpdir.join('entry.h5.123.tmp').write('')
+    orca.clear_disk_cache()
+    assert tmpdir.listdir() == []
+
+
+def test_disk_cache_computed_column_inputs(tmpdir):
+    orca.set_disk_cache(str(tmpdir))
+    orca.add_table('t', pd.DataFrame({'a': [1, 2, 3]}))
+    orca.add_injectable('x', 2)
+
+    @orca.column('t')
+    def ax(a='t.a', x='x'):
+        return a * x
+
+    @orca.table(cache=True)
+    def summary(t):
+        return pd.DataFrame({'total': [t.ax.sum()]})
+
+    assert orca.get_table('summary').total[0] == 12
+
+    # as in a new process, only the disk cache is left
+    orca.clear_cache()
+    orca.add_injectable('x', 5)
+    assert orca.get_table('summary').total[0] == 30
+
+
+def test_cache_stats(df):
+    orca.add_table('table', df)
+
+    @orca.column('table', cache=True)
+    def c(col='table.a'):
+        return col * 2
+
+    @orca.injectable()
+    def x():
+        return 1
+
+    orca.get_table('table').c
+    orca.get_table('table').c
+    orca.get_injectable('x')
+    orca.get_injectable('x')
+
+    stats = orca.cache_stats()
+    assert list(stats.index) == [('column', 'table.c'), ('injectable', 'x')]
+
+    counts = ['hits', 'misses', 'recomputations', 'evictions']
+    col = stats.loc[('column', 'table.c')]
+    assert col['cache']
+    assert col['cache_scope'] == 'forever'
+    assert list(col[counts]) == [1, 1, 0, 0]
+    assert col['compute_time'] >= 0
+    assert col['nbytes'] == orca._value_nbytes(df.a * 2)
+
+    inj = stats.loc[('injectable', 'x')]
+    assert list(inj[counts]) == [0, 2, 1, 0]
+    assert inj['nbytes'] == 0
+
+    orca.reset_cache_stats()
+    stats = orca.cache_stats()
+    assert (stats[counts] == 0).all().all()
+
+
+def test_auto_cache_scope(df):
+    wrapped = orca.add_table('table', df)
+    orca.add_injectable('x', 2)
+    calls = []
+
+    @orca.column('table', cache=True, cache_scope='auto')
+    def a_x(col='table.a', x='x'):
+        calls.append('a_x')
+        return col * x
+
+    @orca.injectable(cache=True, cache_scope='auto')
+    def total(table):
+        calls.append('total')
+        return table.to_frame(['a', 'b']).sum().sum()
+
+    def evaluate():
+        return orca.get_table('table').a_x, orca.get_injectable('total')
+
+    evaluate()
+    evaluate()
+    assert calls == ['a_x', 'total']
+
+    # updating a column only affects values that read it
+    wrapped.update_col('b', pd.Series([0, 0, 0], index=df.index))
+    col, tot = evaluate()
+    assert calls == ['a_x', 'total', 'total']
+    assert tot == 6
+
+    # a new injectable value is a changed input
+    orca.add_injectable('x', 3)
+    col, _ = evaluate()
+    pdt.assert_series_equal(col, df.a * 3)
+    assert calls.count('a_x') == 2
+
+    with orca.injectables(x=4):
+        col, _ = evaluate()
+        pdt.assert_series_equal(col, df.a * 4)
+
+    col, _ = evaluate()
+    pdt.assert_series_equal(col, df.a * 3)
+    assert calls.count('a_x') == 4
+
+    orca.clear_cache(scope='auto')
+    assert not orca._COLUMN_CACHE and not orca._INJECTABLE_CACHE
+
+
+def test_dataframe_wrapper_version(df):
+    wrapped = orca.add_table('table', df)
+    version = wrapped.version
+
+    wrapped.update_col('c', df.a)
+    assert wrapped.version > version
+    version = wrapped.version
+
+    wrapped['c'] = df.b
+    assert wrapped.version > version
+    version = wrapped.version
+
+    wrapped.update_col_from_series('c', df.a)
+    assert wrapped.version > version
+
+    orca.add_column('table', 'd', lambda table: table.c, cache=True)
+    orca.update_column_scope('table', 'd', 'auto')
+    assert orca.get_raw_column('table', 'd').cache_scope == 'auto'
+
+
+def test_cache_budget_workers():
+    index = pd.RangeIndex(100)
+    orca.add_table('t', pd.DataFrame(index=index))
+
+    def make_column(i):
+        def func():
+            return pd.Series(float(i), index=index)
+        return func
+
+    names = ['c{}'.format(i) for i in range(50)]
+    for i, name in enumerate(names):
+        orca.add_column('t', name, make_column(i), cache=True)
+
+    # room for a few columns, so threads keep evicting each other's
+    orca.set_cache_budget(
+        3 * orca._value_nbytes(pd.Series(0., index=index)))
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(20):
+            frame = orca.get_table('t').to_frame(names, workers=8)
+            assert list(frame.iloc[0]) == list(map(float, range(50)))
+            orca.precompute(['t.' + name for name in names], workers=8)
+            orca.clear_cache()
+    finally:
+        sys.setswitchinterval(interval)
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_precompute(df, workers):
+    orca.add_table('table', df)
+    calls = []
+
+    @orca.table(cache=True)
+    def doubled(table):
+        calls.append('doubled')
+        return table.to_frame(['a', 'b']) * 2
+
+    @orca.column('doubled', cache=True)
+    def shared(col='doubled.a'):
+        calls.append('shared')
+        return col + 1
+
+    @orca.column('doubled')
+    def uncached(col='doubled.shared'):
+        calls.append('uncached')
+        return col + 1
+
+    @orca.column('doubled', cache=True)
+    def c1(col='doubled.uncached'):
+        calls.append('c1')
+        return col * 10
+
+    @orca.column('table', cache=True)
+    def c2(col='doubled.shared', x='x'):
+        calls.append('c2')
+        return col * x
+
+    orca.add_injectable('x', 5)
+
+    levels = orca._func_levels(['doubled.c1', 'table.c2'])
+    assert [[f.name for f in level] for level in levels] == \
+        [['doubled'], ['shared'], ['uncached', 'c2'], ['c1']]
+
+    orca.precompute(['doubled.c1', 'table.c2'], workers=workers)
+    assert sorted(calls) == ['c1', 'c2', 'doubled', 'shared', 'uncached']
+    assert ('doubled', 'c1') in orca._COLUMN_CACHE
+    assert ('table', 'c2') in orca._COLUMN_CACHE
+    assert ('doubled', 'uncached') not in orca._COLUMN_CACHE
+
+    pdt.assert_series_equal(
+        orca.get_table('table').c2, (df.a * 2 + 1) * 5, check_names=False)
+    assert len(calls) == 5
+
+    with pytest.raises(KeyError):
+        orca.precompute(['nope.c1'])
+
+
 def test_table_func_local_cols(df):
     @orca.table()
     def table():
@@ -1008,6 +1998,86 @@ def store_name(request):
     return fname
 
 
+def test_dependency_graph(df):
+    orca.add_table('a', df)
+    orca.add_injectable('x', 2)
+
+    @orca.table()
+    def b(a, x):
+        return a.to_frame() * x
+
+    @orca.column('b')
+    def c(col='a.a'):
+        return col
+
+    @orca.injectable()
+    def y(v='b.c'):
+        return v.sum()
+
+    @orca.step()
+    def s(b, y):
+        pass
+
+    orca.broadcast('a', 'b', cast_index=True, onto_on='a_id')
+
+    graph = orca.dependency_graph()
+    assert set(graph.nodes) == {
+        ('table', 'a'), ('table', 'b'), ('column', 'b.c'),
+        ('column', 'a.a'), ('column', 'b.a_id'), ('injectable', 'x'),
+        ('injectable', 'y'), ('broadcast', 'a->b'), ('step', 's')}
+    assert set(graph.predecessors(('table', 'b'))) == {
+        ('table', 'a'), ('injectable', 'x')}
+    assert graph.predecessors(('column', 'b.c')) == [('column', 'a.a')]
+    assert graph.predecessors(('column', 'a.a')) == [('table', 'a')]
+    assert set(graph.successors(('injectable', 'y'))) == {('step', 's')}
+    assert set(graph.predecessors(('broadcast', 'a->b'))) == {
+        ('table', 'a'), ('table', 'b'), ('column', 'b.a_id')}
+    assert graph.cycles() == []
+
+    order = graph.topological_order()
+    assert set(order) == set(graph.nodes)
+    for a, b in graph.edges:
+        assert order.index(a) < order.index(b)
+
+    dot = graph.to_dot()
+    assert dot.startswith('digraph orca {')
+    assert '"column:a.a" -> "column:b.c";' in dot
+
+
+def test_dependency_graph_cycles():
+    @orca.injectable()
+    def x(y):
+        return y
+
+    @orca.injectable()
+    def y(z):
+        return z
+
+    @orca.injectable()
+    def z(x):
+        return x
+
+    graph = orca.dependency_graph()
+    cycles = graph.cycles()
+    assert len(cycles) == 1
+    assert set(cycles[0]) == {
+        ('injectable', 'x'), ('injectable', 'y'), ('injectable', 'z')}
+
+    with pytest.raises(orca.OrcaError):
+        graph.topological_order()
+
+
+def test_dependency_graph_networkx():
+    nx = pytest.importorskip('networkx')
+    orca.add_injectable('x', 1)
+    orca.add_injectable('y', lambda x: x)
+
+    graph = orca.dependency_graph().to_networkx()
+    assert isinstance(graph, nx.DiGraph)
+    assert list(graph.edges) == [(('injectable', 'x'), ('injectable', 'y'))]
+    assert graph.nodes[('injectable', 'x')]['kind'] == 'injectable'
+
+
 def test_write_tables(df, store_name):
     orca.add_table('table', df)
 
@@ -1038,6 +2108,209 @@ def test_write_all_tables(df, store_name):
             assert t in store
 
 
+def test_run_concurrent_steps(df, capsys):
+    orca.add_table('t1', df)
+    orca.add_table('t2', df.copy())
+    orca.add_table('t3', df.copy())
+    barrier = threading.Barrier(2, timeout=10)
+
+    @orca.column('t2', cache=True, cache_scope='step')
+    def doubled(a='t2.a'):
+        return a * 2
+
+    @orca.step(writes=['t1.c'])
+    def s1(t1):
+        barrier.wait()
+        t1['c'] = t1.a + 1
+
+    @orca.step(writes=['t2'])
+    def s2(t2):
+        barrier.wait()
+        t2['c'] = t2.doubled
+
+    @orca.step(writes=['t3'])
+    def s3(t1, t2, t3):
+        t3['c'] = t1.c + t2.c
+
+    @orca.step()
+    def s4(t3):
+        pass
+
+    @orca.step(writes=['t3'])
+    def s5(t3, iter_step):
+        pass
+
+    steps = ['s1', 's2', 's3', 's4', 's5']
+    assert orca._step_batches(steps) == [['s1', 's2'], ['s3'], ['s4'], ['s5']]
+
+    orca.run(steps, workers=2)
+    pdt.assert_series_equal(
+        orca.get_table('t3').c, df.a + 1 + df.a * 2, check_names=False)
+    assert ('t2', 'doubled') not in orca._COLUMN_CACHE
+
+    out = capsys.readouterr().out
+    started = [
+        line for line in out.splitlines() if line.startswith('Running step')]
+    assert started == ['Running step {!r}'.format(s) for s in steps]
+
+
+def test_async_functions(df):
+    events = []
+    running = []
+    overlaps = []
+
+    async def track(name):
+        # record which other functions are awaited at the same time
+        running.append(name)
+        await asyncio.sleep(0.01)
+        overlaps.append((name, sorted(running)))
+        running.remove(name)
+
+    @orca.injectable(cache=True)
+    async def slow1():
+        await track('slow1')
+        return 1
+
+    @orca.injectable()
+    async def slow2():
+        await track('slow2')
+        return 2
+
+    @orca.table()
+    async def table(slow1):
+        await track('table')
+        return df * slow1
+
+    @orca.step()
+    async def step(table, slow1, slow2):
+        await asyncio.sleep(0)
+        events.append((len(table), slow1, slow2))
+
+    assert orca.get_injectable('slow2') == 2
+    pdt.assert_frame_equal(orca.get_table('table').to_frame(), df)
+
+    orca.clear_cache()
+    orca.reset_cache_stats()
+    del overlaps[:]
+    orca.run(['step'])
+    # slow1 and slow2 are awaited together, then the table
+    assert ['slow1', 'slow2'] in [names for _, names in overlaps[:2]]
+    assert overlaps[2] == ('table', ['table'])
+    assert events == [(3, 1, 2)]
+    stats = orca.cache_stats().loc[('injectable', 'slow1')]
+    assert stats['misses'] == 1
+
+    async def in_loop():
+        orca.run(['step'])
+        await orca.run_async(['step'])
+
+    orca._run_coroutine(in_loop())
+    assert events == [(3, 1, 2)] * 3
+
+
+def test_async_registration():
+    @orca.injectable()
+    async def value():
+        return 1
+
+    assert orca._ASYNC_NODES == {('injectable', 'value')}
+    orca.add_injectable('value', lambda: 2)
+    assert not orca._ASYNC_NODES
+
+
+def test_run_prefetch(df):
+    orca.add_table('inputs', df)
+    loaded = {}
+    # only passed if slow is prefetched while s1 runs
+    barrier = threading.Barrier(2, timeout=10)
+
+    @orca.table(cache=True)
+    def slow():
+        loaded['slow'] = threading.current_thread().name
+        barrier.wait()
+        return df
+
+    @orca.table(cache=True)
+    def derived(inputs):
+        loaded['derived'] = threading.current_thread().name
+        return inputs.to_frame() * 2
+
+    @orca.step(writes=['inputs'])
+    def s1(inputs):
+        barrier.wait()
+        inputs['a'] = inputs.a + 1
+
+    @orca.step()
+    def s2(slow, derived):
+        assert derived.a.tolist() == [4, 6, 8]
+
+    assert [f.name for f in orca._prefetch_funcs(['s1'], ['s2'])] == ['slow']
+
+    orca.run(['s1', 's2'], prefetch=True)
+    assert loaded['slow'] != threading.current_thread().name
+    assert loaded['derived'] == threading.current_thread().name
+
+
+def test_run_prefetch_undeclared_writes():
+    orca.add_injectable('rate', 1)
+
+    @orca.injectable(cache=True)
+    def scaled(rate):
+        return rate * 100
+
+    @orca.step()
+    def set_policy():
+        orca.add_injectable('rate', 2)
+
+    @orca.step()
+    def check(scaled):
+        assert scaled == 200
+
+    assert orca._prefetch_funcs(['set_policy'], ['check']) == []
+    orca.run(['set_policy', 'check'], prefetch=True)
+
+
+@requires_fork
+def test_run_scenarios(df):
+    orca.add_table('table', df)
+    orca.add_injectable('rate', 1)
+
+    @orca.table(cache=True)
+    def scaled(table, rate):
+        return table.to_frame(['a']) * rate
+
+    @orca.step()
+    def grow(table, scaled):
+        table['a'] = scaled.a + 1
+
+    orca.precompute(['scaled'])
+    scenarios = {'low': {'rate': 2}, 'high': {'rate': 10}}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        outputs = orca.run_scenarios(
+            ['grow'], iter_vars=[2020], scenarios=scenarios, workers=2,
+            data_out=os.path.join(tmpdir, '{scenario}.h5'),
+            out_run_local=False)
+        assert sorted(outputs) == ['high', 'low']
+
+        for name, overrides in scenarios.items():
+            with pd.HDFStore(outputs[name], mode='r') as store:
+                pdt.assert_series_equal(
+                    store['2020/table']['a'], df.a * overrides['rate'] + 1)
+
+    # the parent's registry is untouched
+    pdt.assert_frame_equal(orca.get_table('table').to_frame(), df)
+    assert orca.get_injectable('rate') == 1
+
+    @orca.step()
+    def fail():
+        raise ValueError('scenario failed')
+
+    with pytest.raises(orca.OrcaError) as e:
+        orca.run_scenarios(['fail'], scenarios={'bad': {}})
+    assert 'scenario failed' in str(e.value)
+
+
 def test_run_and_write_tables(df, store_name):
     orca.add_table('table', df)
 
@@ -1188,6 +2461,21 @@ def test_temporary_tables_cm():
     assert sorted(orca._TABLES.keys()) == ['a']
 
 
+def test_temporary_tables_clears_column_cache(df):
+    orca.add_table('a', df)
+
+    @orca.column('a', cache=True)
+    def c(a):
+        return a.a * 2
+
+    with orca.temporary_tables(a=df * 10):
+        pdt.assert_series_equal(orca.get_table('a').c, df.a * 20,
+                                check_names=False)
+
+    pdt.assert_series_equal(orca.get_table('a').c, df.a * 2,
+                            check_names=False)
+
+
 def test_is_expression():
     assert orca.is_expression('name') is False
     assert orca.is_expression('table.column') is True
@@ -1209,6 +2497,47 @@ def test_eval_variable(df):
     pdt.assert_series_equal(orca.eval_variable('table.a'), df.a * 3)
 
 
+def test_eval_variables(df):
+    calls = []
+    orca.add_injectable('x', 3)
+
+    @orca.injectable()
+    def factor(x):
+        calls.append('factor')
+        return x * 2
+
+    @orca.table()
+    def table(factor):
+        calls.append('table')
+        return df * factor
+
+    @orca.column('table')
+    def shared(a='table.a'):
+        calls.append('shared')
+        return a + 1
+
+    @orca.column('table')
+    def c1(shared='table.shared'):
+        return shared * 2
+
+    @orca.column('table')
+    def c2(shared='table.shared', factor='factor'):
+        return shared * factor
+
+    result = orca.eval_variables(['table.c1', 'table.c2', 'factor'])
+    assert sorted(result) == ['factor', 'table.c1', 'table.c2']
+    assert result['factor'] == 6
+    pdt.assert_series_equal(
+        result['table.c1'], (df.a * 6 + 1) * 2, check_names=False)
+    pdt.assert_series_equal(
+        result['table.c2'], (df.a * 6 + 1) * 6, check_names=False)
+    assert sorted(calls) == ['factor', 'shared', 'table']
+
+    result = orca.eval_variables(['factor', 'table.c1'], x=1)
+    assert result['factor'] == 2
+    assert orca.eval_variable('factor') == 6
+
+
 def test_eval_step(df):
     orca.add_injectable('x', 3)
 
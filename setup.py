@@ -14,7 +14,6 @@ setup(
     license='BSD',
     url='https://github.com/udst/orca',
     classifiers=[
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
         'Programming Language :: Python :: 3.5',
         'Programming Language :: Python :: 3.6',